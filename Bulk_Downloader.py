@@ -1,996 +1,3680 @@
-import os
-import re
-import time
-import json
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse, urlunparse
-from tkinter import *
-from tkinter import ttk, messagebox, filedialog
-from threading import Thread, Event
-
-try:
-    from PIL import Image, ImageDraw, ImageFont, ImageTk
-    _PIL_AVAILABLE = True
-except ImportError:
-    _PIL_AVAILABLE = False
-
-
-def clean_filename(name):
-    # Sanitize filename for Windows
-    sanitized = re.sub(r'[\\/*?:"<>|]', "", name).strip()
-    # Remove single quotes and other problematic characters to avoid path issues
-    sanitized = sanitized.replace("'", "").replace("`", "").replace("\"", "")
-    # Remove trailing dots/spaces (invalid on Windows)
-    sanitized = re.sub(r'[\. ]+$', "", sanitized)
-    # Replace multiple spaces with single spaces
-    sanitized = re.sub(r'\s+', ' ', sanitized)
-    if not sanitized:
-        sanitized = "untitled"
-    # Avoid Windows reserved device names
-    reserved = {"CON", "PRN", "AUX", "NUL", "COM1", "COM2", "COM3", "COM4", "COM5", "COM6", "COM7", "COM8", "COM9", "LPT1", "LPT2", "LPT3", "LPT4", "LPT5", "LPT6", "LPT7", "LPT8", "LPT9"}
-    if sanitized.upper() in reserved:
-        sanitized = f"_{sanitized}_"
-    
-    # Limit filename length to avoid Windows path length issues
-    if len(sanitized) > 100:
-        sanitized = sanitized[:100].rstrip()
-    
-    return sanitized
-
-
-def get_media_links_from_post_html(post_div):
-    media_links = []
-
-    for tag in post_div.find_all(['a', 'img', 'source']):
-        for attr in ['href', 'src']:
-            url = tag.get(attr)
-            if not url:
-                continue
-            url = url.split('?')[0]
-            lower = url.lower()
-            if any(lower.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp4', '.gifv']):
-                if lower.endswith('.gifv') and 'imgur.com' in lower:
-                    media_links.append(url[:-5] + '.mp4')
-                else:
-                    media_links.append(url)
-
-    return list(set(media_links))
-
-
-def download_file(url, dest_folder, filename_prefix=""):
-    timeout = (15, 180)
-    attempts = 2
-    last_error = None
-    
-    # Try multiple URLs for Reddit preview links
-    urls_to_try = _try_convert_reddit_preview_url(url)
-    
-    for attempt_url in urls_to_try:
-        local_filename = attempt_url.split('/')[-1].split("?")[0]
-        
-        # Add prefix if provided (useful for gallery ordering)
-        if filename_prefix:
-            name, ext = os.path.splitext(local_filename)
-            local_filename = f"{filename_prefix}_{local_filename}"
-        
-        filepath = os.path.join(dest_folder, local_filename)
-        
-        # Try downloading this URL variant
-        result = _download_single_url(attempt_url, filepath, dest_folder, timeout, attempts)
-        if result:
-            return result
-        
-        last_error = f"All URL variants failed for {url}"
-    
-    return None
-
-
-def _download_single_url(url, filepath, dest_folder, timeout, attempts):
-    """Helper function to download a single URL"""
-    
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-    
-    # Set appropriate headers based on the URL
-    if 'redgifs.com' in url:
-        headers['Referer'] = 'https://www.redgifs.com/'
-        headers['Origin'] = 'https://www.redgifs.com'
-        headers['Accept'] = '*/*'
-    elif 'redd.it' in url or 'reddit.com' in url:
-        # Reddit preview URLs need proper referrer and headers
-        headers['Referer'] = 'https://www.reddit.com/'
-        headers['Accept'] = 'image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8'
-        headers['Sec-Fetch-Dest'] = 'image'
-        headers['Sec-Fetch-Mode'] = 'no-cors'
-        headers['Sec-Fetch-Site'] = 'cross-site'
-
-    for _ in range(attempts):
-        try:
-            os.makedirs(dest_folder, exist_ok=True)
-            with requests.get(url, stream=True, headers=headers, timeout=timeout) as r:
-                r.raise_for_status()
-                with open(filepath, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=1024 * 256):
-                        if not chunk:
-                            continue
-                        f.write(chunk)
-            # Verify file was created and has content
-            if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
-                return filepath
-            else:
-                return None
-        except Exception as e:
-            try:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-            except Exception:
-                pass
-    
-    # Return None if all attempts failed
-    return None
-
-def parse_cookie_string_to_dict(cookies_str: str) -> dict:
-    # Accept either raw cookie string or a full "Cookie: a=b; c=d" header
-    if cookies_str.lower().startswith("cookie:"):
-        cookies_str = cookies_str.split(":", 1)[1]
-    cookies: dict[str, str] = {}
-    for part in cookies_str.split(';'):
-        if '=' not in part:
-            continue
-        key, value = part.strip().split('=', 1)
-        # Skip cookie attributes that sometimes get included by exporters
-        if key.lower() in {"path", "domain", "expires", "max-age", "secure", "httponly", "samesite"}:
-            continue
-        cookies[key] = value
-    return cookies
-
-
-def normalize_saved_url_to_old_reddit(url: str) -> str:
-    parsed = urlparse(url)
-    netloc = parsed.netloc or "www.reddit.com"
-    if "reddit.com" not in netloc:
-        raise ValueError("URL must be a reddit.com URL")
-    # Force old.reddit.com for server-rendered pages
-    netloc = "old.reddit.com"
-    path = parsed.path
-    if not path.endswith('/'):
-        path = path + '/'
-    # Ensure it points to /saved/
-    if "/saved/" not in path:
-        if path.endswith("/saved/"):
-            pass
-        elif path.endswith("/saved/") is False and path.rstrip('/').endswith('/saved') is False:
-            if path.endswith('/'):
-                path = path + "saved/"
-            else:
-                path = path + "/saved/"
-    new_parsed = parsed._replace(netloc=netloc, path=path, params='', query='', fragment='')
-    return urlunparse(new_parsed)
-
-
-_redgifs_auth_cache: dict = {"token": None, "fetched_at": 0}
-
-
-def _get_redgifs_token(headers: dict, log_callback) -> str | None:
-    now = time.time()
-    token = _redgifs_auth_cache.get('token')
-    if token and (now - _redgifs_auth_cache.get('fetched_at', 0)) < 60 * 30:
-        return token
-    try:
-        resp = requests.get('https://api.redgifs.com/v2/auth/temporary', headers=headers, timeout=15)
-        resp.raise_for_status()
-        j = resp.json()
-        token = j.get('token') or (j.get('data') or {}).get('token')
-        if token:
-            _redgifs_auth_cache['token'] = token
-            _redgifs_auth_cache['fetched_at'] = now
-            return token
-    except Exception as e:
-        log_callback(f"Failed to auth with Redgifs: {e}")
-    return None
-
-
-def _extract_redgifs_id_from_url(url: str) -> str | None:
-    try:
-        p = urlparse(url)
-        if 'redgifs.com' not in p.netloc and 'gifdeliverynetwork.com' not in p.netloc and 'gfycat.com' not in p.netloc:
-            return None
-        parts = [seg for seg in p.path.split('/') if seg]
-        if not parts:
-            return None
-        if parts[0] in {'watch', 'ifr'} and len(parts) >= 2:
-            return parts[1]
-        return parts[-1]
-    except Exception:
-        return None
-
-
-def _resolve_redgifs_direct_urls(url: str, headers: dict, log_callback) -> list[str]:
-    if 'gfycat.com' in url:
-        try:
-            p = urlparse(url)
-            parts = [seg for seg in p.path.split('/') if seg]
-            gif_id = parts[1] if parts and parts[0] == 'ifr' and len(parts) > 1 else (parts[0] if parts else None)
-            if gif_id:
-                url = f"https://redgifs.com/ifr/{gif_id}"
-        except Exception:
-            pass
-
-    gid = _extract_redgifs_id_from_url(url)
-    if not gid:
-        return []
-    token = _get_redgifs_token(headers, log_callback)
-    if not token:
-        return []
-    try:
-        api_headers = dict(headers)
-        api_headers['Authorization'] = f"Bearer {token}"
-        resp = requests.get(f'https://api.redgifs.com/v2/gifs/{gid}', headers=api_headers, timeout=20)
-        resp.raise_for_status()
-        data = resp.json()
-        gif = data.get('gif') or data.get('result') or data.get('data') or {}
-        urls = gif.get('urls') or {}
-        candidates = [urls.get('hd'), urls.get('sd'), urls.get('gif')]
-        return [u for u in candidates if isinstance(u, str)]
-    except Exception as e:
-        log_callback(f"Failed to resolve Redgifs {gid}: {e}")
-        return []
-
-
-def _convert_imgur_gifv_to_mp4(url: str) -> str:
-    if url.lower().endswith('.gifv') and 'imgur.com' in url:
-        return url[:-5] + '.mp4'
-    return url
-
-
-def _try_convert_reddit_preview_url(url: str) -> list[str]:
-    """
-    Convert Reddit preview URLs to potential direct media URLs.
-    Reddit preview URLs often return 403, but direct media URLs work.
-    """
-    if not ('preview.redd.it' in url or 'external-preview.redd.it' in url):
-        return [url]
-    
-    urls_to_try = [url]  # Always try original first
-    
-    try:
-        # Try converting preview.redd.it to i.redd.it (direct media)
-        if 'preview.redd.it' in url:
-            direct_url = url.replace('preview.redd.it', 'i.redd.it')
-            urls_to_try.append(direct_url)
-        
-        # Try removing preview parameters
-        if '?' in url:
-            clean_url = url.split('?')[0]
-            if clean_url != url:
-                urls_to_try.append(clean_url)
-                # Also try the i.redd.it version of the clean URL
-                if 'preview.redd.it' in clean_url:
-                    direct_clean = clean_url.replace('preview.redd.it', 'i.redd.it')
-                    urls_to_try.append(direct_clean)
-    
-    except Exception:
-        pass
-    
-    return urls_to_try
-
-
-def extract_media_urls_from_post_data(post_data: dict, headers: dict, log_callback) -> list[str]:
-    media_urls: list[str] = []
-
-    # Direct media link overrides
-    url_overridden = post_data.get('url_overridden_by_dest') or post_data.get('url')
-    if isinstance(url_overridden, str):
-        cleaned = url_overridden.split('?')[0]
-        lower = cleaned.lower()
-        if 'redgifs.com' in lower or 'gifdeliverynetwork.com' in lower or 'gfycat.com' in lower:
-            media_urls.extend(_resolve_redgifs_direct_urls(cleaned, headers, log_callback))
-        else:
-            if lower.endswith('.gifv') and 'imgur.com' in lower:
-                cleaned = _convert_imgur_gifv_to_mp4(cleaned)
-            if any(lower.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp4']):
-                media_urls.append(cleaned)
-
-    # Reddit-hosted gallery
-    if post_data.get('is_gallery') and isinstance(post_data.get('media_metadata'), dict):
-        media_metadata = post_data['media_metadata']
-        gallery_data = post_data.get('gallery_data', {})
-        gallery_items = gallery_data.get('items', []) if isinstance(gallery_data, dict) else []
-        
-        # Use gallery_data order if available, otherwise use media_metadata keys
-        if gallery_items:
-            # Process in the order specified by gallery_data
-            for gallery_item in gallery_items:
-                if not isinstance(gallery_item, dict):
-                    continue
-                media_id = gallery_item.get('media_id')
-                if not media_id or media_id not in media_metadata:
-                    continue
-                item = media_metadata[media_id]
-                if not isinstance(item, dict):
-                    continue
-                
-                # Extract URL and decode HTML entities
-                url = None
-                # Prefer source (original) quality over preview
-                source = item.get('s') or {}
-                url = source.get('u') or source.get('url')
-                
-                # If no source URL, try the highest resolution preview
-                if not url:
-                    previews = item.get('p') or []
-                    if previews:
-                        best = previews[-1]
-                        url = best.get('u') or best.get('url')
-                
-                if url:
-                    # Decode HTML entities in URLs (Reddit sometimes encodes &amp; etc.)
-                    import html as html_module
-                    url = html_module.unescape(url)
-                    media_urls.append(url.split('?')[0])
-        else:
-            # Fallback: process all media_metadata items (no guaranteed order)
-            for item in media_metadata.values():
-                if not isinstance(item, dict):
-                    continue
-                # Prefer source (original) quality over preview
-                url = None
-                source = item.get('s') or {}
-                url = source.get('u') or source.get('url')
-                
-                # If no source URL, try the highest resolution preview
-                if not url:
-                    previews = item.get('p') or []
-                    if previews:
-                        best = previews[-1]
-                        url = best.get('u') or best.get('url')
-                
-                if url:
-                    # Decode HTML entities in URLs
-                    import html as html_module
-                    url = html_module.unescape(url)
-                    media_urls.append(url.split('?')[0])
-
-    # Reddit-hosted videos
-    secure_media = post_data.get('secure_media') or {}
-    if isinstance(secure_media, dict):
-        reddit_video = secure_media.get('reddit_video') or {}
-        if isinstance(reddit_video, dict):
-            fallback_url = reddit_video.get('fallback_url')
-            if isinstance(fallback_url, str):
-                media_urls.append(fallback_url.split('?')[0])
-        oembed = secure_media.get('oembed') or {}
-        if isinstance(oembed, dict):
-            html = oembed.get('html') or ''
-            if isinstance(html, str) and ('redgifs.com' in html or 'gfycat.com' in html or 'imgur.com' in html):
-                try:
-                    soup = BeautifulSoup(html, 'html.parser')
-                    iframe = soup.find('iframe')
-                    if iframe and iframe.get('src'):
-                        src = iframe['src']
-                        lower = src.lower()
-                        if 'redgifs.com' in lower or 'gfycat.com' in lower:
-                            media_urls.extend(_resolve_redgifs_direct_urls(src, headers, log_callback))
-                        elif lower.endswith('.gifv') and 'imgur.com' in lower:
-                            media_urls.append(_convert_imgur_gifv_to_mp4(src))
-                except Exception:
-                    pass
-
-    # De-duplicate
-    unique_urls = []
-    seen = set()
-    for u in media_urls:
-        if u not in seen:
-            unique_urls.append(u)
-            seen.add(u)
-    return unique_urls
-
-
-def fetch_all_saved_items_json(saved_url: str, headers: dict, cookies: dict, log_callback) -> list[dict]:
-    items: list[dict] = []
-    after: str | None = None
-
-    # Build base JSON endpoint
-    # Example: https://old.reddit.com/user/<username>/saved/.json?limit=100&raw_json=1
-    while True:
-        params = {
-            'limit': '100',
-            'raw_json': '1',
-        }
-        if after:
-            params['after'] = after
-
-        json_url = saved_url.rstrip('/') + '/.json'
-        try:
-            resp = requests.get(json_url, headers=headers, cookies=cookies, params=params, timeout=30)
-            if resp.status_code in (401, 403):
-                log_callback("Authentication failed. Make sure your cookie header is from a logged-in session.")
-                break
-            resp.raise_for_status()
-        except Exception as e:
-            log_callback(f"Error fetching JSON: {e}")
-            break
-
-        try:
-            data = resp.json()
-        except json.JSONDecodeError:
-            log_callback("Failed to parse JSON. Your cookies may be invalid or you were redirected to a login page.")
-            break
-
-        if not isinstance(data, dict) or 'data' not in data or 'children' not in data['data']:
-            log_callback("No saved items found or unexpected response structure.")
-            break
-
-        children = data['data']['children']
-        if not children:
-            break
-
-        items.extend(children)
-        after = data['data'].get('after')
-        log_callback(f"Fetched {len(children)} saved items (total: {len(items)}).")
-
-        # Stop if no more pages
-        if not after:
-            break
-
-        # Be polite and avoid hammering the server
-        time.sleep(0.6)
-
-    return items
-
-
-def scrape_reddit_saved(url, cookies_str, output_dir, log_callback, pause_event=None, stop_event=None):
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) RedditSavedDownloader/1.0'}
-    cookies = parse_cookie_string_to_dict(cookies_str)
-    cookies.setdefault('over18', '1')
-
-    try:
-        saved_url = normalize_saved_url_to_old_reddit(url)
-    except Exception as e:
-        log_callback(f"Invalid URL: {e}")
-        return
-
-    log_callback(f"Using endpoint: {saved_url}")
-    items = fetch_all_saved_items_json(saved_url, headers, cookies, log_callback)
-    if not items:
-        log_callback("No saved items found. If this seems wrong, re-copy your Cookie header from a logged-in tab on old.reddit.com.")
-        return
-
-    log_callback(f"Found {len(items)} saved items. Extracting media and downloading...")
-
-    for idx, child in enumerate(items, start=1):
-        # Check for stop
-        if stop_event and stop_event.is_set():
-            log_callback("⏹ Stopped downloading.")
-            return
-        
-        # Wait if paused
-        if pause_event and pause_event.is_set():
-            while pause_event.is_set() and not (stop_event and stop_event.is_set()):
-                time.sleep(0.1)
-            if stop_event and stop_event.is_set():
-                log_callback("⏹ Stopped downloading.")
-                return
-        
-        if not isinstance(child, dict) or 'data' not in child:
-            continue
-        post = child['data']
-        post_title = clean_filename(post.get('title') or post.get('name') or f'post_{idx}')
-        post_folder = os.path.join(output_dir, post_title)
-        log_callback(f"Processing post: '{post_title}' -> {post_folder}")
-
-        # Check for stop before processing
-        if stop_event and stop_event.is_set():
-            log_callback("⏹ Stopped downloading.")
-            return
-
-        media_links = extract_media_urls_from_post_data(post, headers, log_callback)
-        if not media_links:
-            # Fallback to minimal HTML scrape for any obvious direct links when JSON lacks media
-            permalink = post.get('permalink')
-            if permalink:
-                try:
-                    html_url = 'https://old.reddit.com' + permalink
-                    resp = requests.get(html_url, headers=headers, cookies=cookies, timeout=30)
-                    if resp.ok:
-                        soup = BeautifulSoup(resp.text, 'html.parser')
-                        media_links = get_media_links_from_post_html(soup)
-                except Exception:
-                    pass
-
-        if not media_links:
-            log_callback(f"[{post_title}] No media found.")
-            continue
-
-        log_callback(f"[{post_title}] Found {len(media_links)} media file(s).")
-        downloaded_any = False
-        
-        # Check if this is a gallery to add numbering
-        is_gallery = post.get('is_gallery', False)
-        
-        for media_idx, media_url in enumerate(media_links, 1):
-            # Check for stop before each download
-            if stop_event and stop_event.is_set():
-                log_callback("⏹ Stopped downloading.")
-                return
-            
-            # Wait if paused
-            if pause_event and pause_event.is_set():
-                while pause_event.is_set() and not (stop_event and stop_event.is_set()):
-                    time.sleep(0.1)
-                if stop_event and stop_event.is_set():
-                    log_callback("⏹ Stopped downloading.")
-                    return
-            
-            log_callback(f"→ {media_url}")
-            
-            # Add numbering for gallery images to maintain order
-            filename_prefix = f"{media_idx:02d}" if is_gallery and len(media_links) > 1 else ""
-            
-            result = download_file(media_url, post_folder, filename_prefix)
-            if result:
-                downloaded_any = True
-                log_callback(f"  ✓ Saved to: {result}")
-            else:
-                log_callback(f"  ✗ Failed to download: {media_url}")
-        if not downloaded_any:
-            try:
-                if os.path.isdir(post_folder):
-                    try:
-                        is_empty = len(os.listdir(post_folder)) == 0
-                    except FileNotFoundError:
-                        is_empty = False
-                    if is_empty:
-                        os.rmdir(post_folder)
-            except Exception:
-                pass
-
-    if not (stop_event and stop_event.is_set()):
-        log_callback("✅ Done downloading saved posts!")
-
-
-# GUI Setup
-# Progress tracking variables
-progress_state = {"total": 0, "current": 0, "active": False}
-# Download control variables
-pause_event = Event()
-stop_event = Event()
-download_thread = None
-
-def restore_start_button():
-    pause_btn.pack_forget()
-    stop_btn.pack_forget()
-    download_btn.pack(ipadx=25, ipady=8)
-
-def start_download():
-    global download_thread
-    
-    url = url_entry.get().strip()
-    cookie = cookie_entry.get().strip()
-    folder = folder_entry.get().strip() or os.getcwd()
-
-    if not url or not cookie:
-        messagebox.showwarning("Input Needed", "Please provide both URL and Cookie.")
-        return
-
-    # Reset progress and control events
-    progress_state["total"] = 0
-    progress_state["current"] = 0
-    progress_state["active"] = True
-    pause_event.clear()
-    stop_event.clear()
-    progress_label.config(text="")
-    progress_label.pack_forget()  # Hide initially
-    output_box.delete(1.0, END)  # Clear previous log
-    
-    # Update UI to show pause/stop buttons
-    download_btn.pack_forget()
-    pause_btn.pack(side='left', padx=(0, 8), ipadx=20, ipady=8)
-    stop_btn.pack(side='left', ipadx=20, ipady=8)
-
-    def log(msg):
-        # Update GUI on main thread
-        root.after(0, lambda: output_box.insert(END, msg + "\n"))
-        root.after(0, lambda: output_box.see(END))
-        
-        # Parse "Found X saved items" message to extract total
-        if "Found" in msg and "saved items" in msg:
-            match = re.search(r'Found (\d+) saved items', msg)
-            if match:
-                progress_state["total"] = int(match.group(1))
-                progress_state["current"] = 0
-                root.after(0, update_progress_label)
-        
-        # Track when processing posts
-        if "Processing post:" in msg:
-            progress_state["current"] += 1
-            root.after(0, update_progress_label)
-        
-        # Hide progress when done
-        if "Done downloading" in msg or "✅" in msg or "Stopped" in msg:
-            progress_state["active"] = False
-            root.after(100, lambda: progress_label.pack_forget())
-            root.after(100, restore_start_button)
-
-    def update_progress_label():
-        if progress_state["active"] and progress_state["total"] > 0:
-            current = progress_state["current"]
-            total = progress_state["total"]
-            percentage = int((current / total) * 100) if total > 0 else 0
-            progress_text = f"{current}/{total} ({percentage}%)"
-            progress_label.config(text=progress_text)
-            if not progress_label.winfo_viewable():
-                progress_label.pack(side='right')
-
-    download_thread = Thread(target=scrape_reddit_saved, args=(url, cookie, folder, log, pause_event, stop_event), daemon=True)
-    download_thread.start()
-
-def pause_download():
-    if pause_event.is_set():
-        # Resume
-        pause_event.clear()
-        pause_btn.config(text="⏸ Pause Download")
-    else:
-        # Pause
-        pause_event.set()
-        pause_btn.config(text="▶ Resume Download")
-
-def stop_download():
-    stop_event.set()
-    pause_event.clear()  # Clear pause so we can exit
-    progress_state["active"] = False
-    root.after(100, restore_start_button)
-
-
-def browse_folder():
-    folder = filedialog.askdirectory()
-    if folder:
-        folder_entry.delete(0, END)
-        folder_entry.insert(0, folder)
-
-
-def create_tooltip(widget, text, delay_ms=500):
-    """Show a tooltip on hover, hide on leave. Does not take layout space."""
-    tooltip_window = None
-    after_id = None
-
-    def show_tooltip(event):
-        nonlocal tooltip_window, after_id
-        if after_id:
-            root.after_cancel(after_id)
-            after_id = None
-        if tooltip_window:
-            return
-        def do_show():
-            nonlocal tooltip_window
-            if tooltip_window:
-                return
-            tooltip_window = Toplevel(root)
-            tooltip_window.overrideredirect(True)
-            tooltip_window.withdraw()
-            lbl = Label(tooltip_window, text=text, font=("Segoe UI", 9),
-                        bg="#2d2d2d", fg="#e0e0e0", relief='solid', bd=1,
-                        padx=10, pady=8, wraplength=320, justify='left')
-            lbl.pack()
-            tooltip_window.update_idletasks()
-            x = widget.winfo_rootx() + 16
-            y = widget.winfo_rooty() + widget.winfo_height() + 4
-            tooltip_window.geometry(f"+{x}+{y}")
-            tooltip_window.deiconify()
-        after_id = root.after(delay_ms, do_show)
-
-    def hide_tooltip(event):
-        nonlocal tooltip_window, after_id
-        if after_id:
-            root.after_cancel(after_id)
-            after_id = None
-        if tooltip_window:
-            tooltip_window.destroy()
-            tooltip_window = None
-
-    widget.bind('<Enter>', show_tooltip)
-    widget.bind('<Leave>', hide_tooltip)
-
-
-def create_smooth_help_icon(parent, bg_color, size=22):
-    """Create a smooth, anti-aliased '?' in circle icon using PIL (high-res render + downscale). Returns (photo_image, label_widget) or (None, canvas_widget) if PIL unavailable."""
-    if not _PIL_AVAILABLE:
-        return None, None
-    try:
-        scale = 3
-        w, h = size * scale, size * scale
-        bg = bg_color.lstrip("#")
-        bg_rgb = tuple(int(bg[i:i+2], 16) for i in (0, 2, 4))
-        img = Image.new("RGB", (w, h), bg_rgb)
-        draw = ImageDraw.Draw(img)
-        # White circle ring: outer white, inner bg by drawing filled white circle then smaller filled bg circle
-        margin = scale * 2
-        draw.ellipse([margin, margin, w - margin, h - margin], fill=(255, 255, 255), outline=None)
-        inner = scale * 3
-        draw.ellipse([inner, inner, w - inner, h - inner], fill=bg_rgb, outline=None)
-        # White "?" in center
-        try:
-            font = ImageFont.truetype("segoeui.ttf", 14 * scale)
-        except OSError:
-            try:
-                font = ImageFont.truetype("arial.ttf", 14 * scale)
-            except OSError:
-                font = ImageFont.load_default()
-        text = "?"
-        bbox = draw.textbbox((0, 0), text, font=font)
-        tw = bbox[2] - bbox[0]
-        th = bbox[3] - bbox[1]
-        x = (w - tw) // 2 - bbox[0]
-        y = (h - th) // 2 - bbox[1]
-        draw.text((x, y), text, fill=(255, 255, 255), font=font)
-        resample = getattr(Image, "Resampling", None) and Image.Resampling.LANCZOS or getattr(Image, "LANCZOS", Image.BICUBIC)
-        img_small = img.resize((size, size), resample)
-        photo = ImageTk.PhotoImage(img_small)
-        label = Label(parent, image=photo, bg=bg_color, cursor="question_arrow")
-        label._photo = photo
-        return photo, label
-    except Exception:
-        return None, None
-
-
-root = Tk()
-root.title("Reddit Saved Media Downloader")
-root.geometry("750x600")
-
-# Configure dark mode color scheme
-bg_color = "#1e1e1e"  # Dark background
-section_bg = "#2d2d2d"  # Darker section background
-accent_color = "#ff4500"  # Reddit orange
-text_color = "#e0e0e0"  # Light text
-text_color_secondary = "#b0b0b0"  # Secondary text
-border_color = "#404040"  # Dark border
-entry_bg = "#1a1a1a"  # Even darker for entries
-entry_fg = "#ffffff"  # White text in entries
-
-root.configure(bg=bg_color)
-
-# Configure ttk style for dark mode
-style = ttk.Style()
-style.theme_use('clam')
-
-# Configure Entry style for dark mode
-style.configure("TEntry",
-               fieldbackground=entry_bg,
-               foreground="#888888",  # Greyed out text for placeholder
-               borderwidth=1,
-               relief='flat')
-
-# Configure Button style for dark mode
-style.configure("TButton",
-               background=section_bg,
-               foreground=text_color,
-               borderwidth=1,
-               relief='flat',
-               padding=5)
-style.map("TButton",
-         background=[('active', '#3d3d3d')],
-         relief=[('pressed', 'sunken')])
-
-# Configure Accent button style
-style.configure("Accent.TButton",
-               background=accent_color,
-               foreground="#ffffff",
-               font=("Segoe UI", 10, "bold"),
-               padding=(20, 8))
-style.map("Accent.TButton",
-         background=[('active', '#ff5500')],
-         relief=[('pressed', 'sunken')])
-
-# Configure Stop button style (red/danger)
-style.configure("Stop.TButton",
-               background="#d32f2f",
-               foreground="#ffffff",
-               font=("Segoe UI", 10, "bold"),
-               padding=(20, 8))
-style.map("Stop.TButton",
-         background=[('active', '#b71c1c')],
-         relief=[('pressed', 'sunken')])
-
-# Configure Scrollbar style
-style.configure("TScrollbar",
-               background=section_bg,
-               troughcolor=bg_color,
-               borderwidth=0,
-               arrowcolor=text_color,
-               darkcolor=section_bg,
-               lightcolor=section_bg)
-
-# Compact header section
-header_frame = Frame(root, bg=section_bg, relief='flat', bd=0)
-header_frame.pack(fill='x', padx=12, pady=(10, 8))
-
-title_label = Label(header_frame, text="Reddit Bulk Downloader", 
-                    font=("Segoe UI", 16, "bold"), 
-                    bg=section_bg, fg=text_color)
-title_label.pack(pady=(10, 3))
-
-subtitle_label = Label(header_frame, text="Download your saved Reddit posts and media", 
-                      font=("Segoe UI", 8), 
-                      bg=section_bg, fg=text_color_secondary)
-subtitle_label.pack(pady=(0, 10))
-
-# Main content frame
-main_frame = Frame(root, bg=bg_color)
-main_frame.pack(fill='both', expand=True, padx=12, pady=(0, 12))
-
-# Compact input section
-input_section = Frame(main_frame, bg=section_bg, relief='flat', bd=1)
-input_section.pack(fill='x', pady=(0, 10))
-
-# Section title
-section_title = Label(input_section, text="Configuration", 
-                     font=("Segoe UI", 10, "bold"), 
-                     bg=section_bg, fg=text_color, anchor='w')
-section_title.pack(fill='x', padx=15, pady=(12, 10))
-
-# URL field
-url_container = Frame(input_section, bg=section_bg)
-url_container.pack(fill='x', padx=15, pady=(0, 10))
-
-url_label = Label(url_container, text="Reddit Saved URL", 
-                 font=("Segoe UI", 8), 
-                 bg=section_bg, fg=text_color_secondary, anchor='w')
-url_label.pack(fill='x', pady=(0, 4))
-
-# Use regular Entry for URL field to allow individual color control
-url_entry = Entry(url_container, width=100, font=("Segoe UI", 9),
-                 bg=entry_bg, fg="#666666",  # Greyed out placeholder color
-                 insertbackground=text_color,
-                 selectbackground="#404040",
-                 selectforeground=text_color,
-                 relief='flat', bd=1,
-                 highlightthickness=1,
-                 highlightcolor=accent_color,
-                 highlightbackground=border_color)
-placeholder_text = " https://reddit.com/user/YOUR_USERNAME/saved/ "
-url_entry.insert(0, placeholder_text)
-url_entry.pack(fill='x', ipady=5)
-
-# Make placeholder text greyed out, turn white when user types
-def on_url_focus_in(event):
-    if url_entry.get() == placeholder_text:
-        url_entry.delete(0, END)
-        url_entry.config(fg=entry_fg)
-    else:
-        url_entry.config(fg=entry_fg)
-
-def on_url_focus_out(event):
-    if url_entry.get().strip() == "":
-        url_entry.insert(0, placeholder_text)
-        url_entry.config(fg="#666666")
-
-def on_url_key(event):
-    if url_entry.get() != placeholder_text:
-        url_entry.config(fg=entry_fg)
-
-url_entry.bind('<FocusIn>', on_url_focus_in)
-url_entry.bind('<FocusOut>', on_url_focus_out)
-url_entry.bind('<Key>', on_url_key)
-
-# Cookie field
-cookie_container = Frame(input_section, bg=section_bg)
-cookie_container.pack(fill='x', padx=15, pady=(0, 10))
-
-cookie_label_row = Frame(cookie_container, bg=section_bg)
-cookie_label_row.pack(fill='x', pady=(0, 4))
-cookie_label = Label(cookie_label_row, text="Login Cookie", 
-                    font=("Segoe UI", 8), 
-                    bg=section_bg, fg=text_color_secondary, anchor='w')
-cookie_label.pack(side='left')
-# Help icon: smooth white circle + "?" (PIL high-res + downscale for anti-aliasing; fallback Canvas if no PIL)
-_help_icon_size = 22
-cookie_help_icon_photo, cookie_help_icon_label = create_smooth_help_icon(cookie_label_row, section_bg, _help_icon_size)
-if cookie_help_icon_label is not None:
-    cookie_help_icon = cookie_help_icon_label
-    cookie_help_icon.pack(side='left', padx=(4, 0))
-else:
-    cookie_help_icon = Canvas(cookie_label_row, width=_help_icon_size, height=_help_icon_size,
-                              bg=section_bg, highlightthickness=0, cursor="question_arrow")
-    cookie_help_icon.pack(side='left', padx=(4, 0))
-    cookie_help_icon.create_oval(2, 2, _help_icon_size - 2, _help_icon_size - 2,
-                                 outline="#ffffff", width=1.5, fill=section_bg)
-    cookie_help_icon.create_text(_help_icon_size // 2, _help_icon_size // 2, text="?",
-                                 fill="#ffffff", font=("Segoe UI", 11, "bold"))
-create_tooltip(cookie_help_icon,
-    "This is your Reddit session cookie. You can get it from your browser's developer tools (Network or Application tab) or by exporting request headers with a browser extension. Paste the full Cookie header string here.")
-
-cookie_entry = Entry(cookie_container, width=100, font=("Segoe UI", 9),
-                    bg=entry_bg, fg=entry_fg,
-                    insertbackground=text_color,
-                    selectbackground="#404040",
-                    selectforeground=text_color,
-                    relief='flat', bd=1,
-                    highlightthickness=0)  # No border
-cookie_entry.pack(fill='x', ipady=5)
-
-# Folder field
-folder_container = Frame(input_section, bg=section_bg)
-folder_container.pack(fill='x', padx=15, pady=(0, 12))
-
-folder_label = Label(folder_container, text="Output Folder", 
-                    font=("Segoe UI", 8), 
-                    bg=section_bg, fg=text_color_secondary, anchor='w')
-folder_label.pack(fill='x', pady=(0, 4))
-
-folder_frame = Frame(folder_container, bg=section_bg)
-folder_frame.pack(fill='x')
-folder_entry = Entry(folder_frame, width=85, font=("Segoe UI", 9),
-                     bg=entry_bg, fg=entry_fg,
-                     insertbackground=text_color,
-                     selectbackground="#404040",
-                     selectforeground=text_color,
-                     relief='flat', bd=1,
-                     highlightthickness=0)  # No border
-folder_entry.pack(side='left', fill='x', expand=True, ipady=5)
-browse_btn = Button(folder_frame, text="Browse", command=browse_folder,
-                   bg=section_bg, fg=text_color,
-                   activebackground="#3d3d3d",
-                   activeforeground=text_color,
-                   font=("Segoe UI", 9),
-                   relief='solid', bd=1,
-                   highlightthickness=0,
-                   padx=12, pady=5)
-browse_btn.pack(side='left', padx=(6, 0))
-
-# Download button section
-button_frame = Frame(main_frame, bg=bg_color)
-button_frame.pack(fill='x', pady=(0, 10))
-
-download_btn = ttk.Button(button_frame, text="▶ Start Download", 
-                         command=start_download, 
-                         style="Accent.TButton")
-download_btn.pack(ipadx=25, ipady=8)
-
-# Pause and Stop buttons (initially hidden)
-pause_btn = ttk.Button(button_frame, text="⏸ Pause Download", 
-                      command=pause_download,
-                      style="Accent.TButton")
-
-stop_btn = ttk.Button(button_frame, text="⏹ Stop Download", 
-                     command=stop_download,
-                     style="Stop.TButton")
-
-# Output log section - takes remaining space
-log_section = Frame(main_frame, bg=section_bg, relief='flat', bd=1)
-log_section.pack(fill='both', expand=True)
-
-# Title bar with progress indicator on the right
-title_frame = Frame(log_section, bg=section_bg)
-title_frame.pack(fill='x', padx=15, pady=(12, 8))
-
-log_title = Label(title_frame, text="Download Progress", 
-                 font=("Segoe UI", 10, "bold"), 
-                 bg=section_bg, fg=text_color, anchor='w')
-log_title.pack(side='left')
-
-# Progress indicator (initially hidden, appears on the right)
-progress_label = Label(title_frame, text="", 
-                      font=("Segoe UI", 10, "bold"), 
-                      bg=section_bg, fg=accent_color, anchor='e')
-
-# Output box with scrollbar
-log_container = Frame(log_section, bg=section_bg)
-log_container.pack(fill='both', expand=True, padx=15, pady=(0, 12))
-
-scrollbar = ttk.Scrollbar(log_container)
-scrollbar.pack(side='right', fill='y')
-
-output_box = Text(log_container, wrap=WORD, 
-                 font=("Consolas", 8), 
-                 bg=entry_bg, fg="#d0d0d0",
-                 relief='flat', bd=0,
-                 yscrollcommand=scrollbar.set,
-                 padx=8, pady=8,
-                 insertbackground=text_color,
-                 selectbackground="#404040",
-                 selectforeground=text_color)
-output_box.pack(side='left', fill='both', expand=True)
-
-scrollbar.config(command=output_box.yview)
-
-root.mainloop()
+import io
+import os
+import sys
+import re
+import time
+import socket
+import json
+import shutil
+import argparse
+import subprocess
+import multiprocessing
+import importlib.util
+from urllib.parse import urlparse, urlunparse, urljoin
+from threading import Thread, Event, Lock, Condition, BoundedSemaphore, local
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait as futures_wait
+
+# requests, bs4 and Pillow are imported where they are first used: together they cost
+# more than the rest of startup, and the GUI window doesn't need any of them to appear.
+_PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+_STARTUP_T0 = time.perf_counter()
+
+
+def clean_filename(name):
+    # Sanitize filename for Windows
+    sanitized = re.sub(r'[\\/*?:"<>|]', "", name).strip()
+    # Remove single quotes and other problematic characters to avoid path issues
+    sanitized = sanitized.replace("'", "").replace("`", "").replace("\"", "")
+    # Remove trailing dots/spaces (invalid on Windows)
+    sanitized = re.sub(r'[\. ]+$', "", sanitized)
+    # Replace multiple spaces with single spaces
+    sanitized = re.sub(r'\s+', ' ', sanitized)
+    if not sanitized:
+        sanitized = "untitled"
+    # Avoid Windows reserved device names
+    reserved = {"CON", "PRN", "AUX", "NUL", "COM1", "COM2", "COM3", "COM4", "COM5", "COM6", "COM7", "COM8", "COM9", "LPT1", "LPT2", "LPT3", "LPT4", "LPT5", "LPT6", "LPT7", "LPT8", "LPT9"}
+    if sanitized.upper() in reserved:
+        sanitized = f"_{sanitized}_"
+    
+    # Limit filename length to avoid Windows path length issues
+    if len(sanitized) > 100:
+        sanitized = sanitized[:100].rstrip()
+    
+    return sanitized
+
+
+def get_media_links_from_post_html(post_div):
+    media_links = []
+
+    for tag in post_div.find_all(['a', 'img', 'source']):
+        for attr in ['href', 'src']:
+            url = tag.get(attr)
+            if not url:
+                continue
+            url = url.split('?')[0]
+            lower = url.lower()
+            if any(lower.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp4', '.gifv']):
+                if lower.endswith('.gifv') and 'imgur.com' in lower:
+                    media_links.append(url[:-5] + '.mp4')
+                else:
+                    media_links.append(url)
+
+    return list(set(media_links))
+
+
+# Download control: pause/stop that reaches into in-flight transfers
+class PauseEvent(Event):
+    """Event whose clear() (resume) wakes threads blocked in wait_until_clear()."""
+
+    def clear(self):
+        with self._cond:
+            self._flag = False
+            self._cond.notify_all()
+
+    def wait_until_clear(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._flag, timeout)
+
+
+def _wait_if_paused(pause_event, stop_event) -> bool:
+    """Block while paused. Returns False if a stop was requested."""
+    while pause_event is not None and pause_event.is_set():
+        if stop_event is not None and stop_event.is_set():
+            return False
+        if isinstance(pause_event, PauseEvent):
+            # Resume and the GUI's stop (which clears the pause) wake this immediately;
+            # the timeout only covers callers that set stop_event without clearing the pause
+            pause_event.wait_until_clear(timeout=1.0)
+        elif stop_event is not None:
+            stop_event.wait(0.25)
+        else:
+            time.sleep(0.25)
+    return not (stop_event is not None and stop_event.is_set())
+
+
+_active_transfers: set = set()
+_active_transfers_lock = Lock()
+
+
+# Max concurrent transfers per media host, shared by every download thread
+_host_limits: dict = {"per_host": 4}
+_host_slots: dict = {}
+_host_slots_lock = Lock()
+
+
+def set_max_connections_per_host(limit: int) -> None:
+    with _host_slots_lock:
+        _host_limits["per_host"] = max(1, limit)
+        # Transfers holding an old slot release it into the old semaphore; new ones use the new limit
+        _host_slots.clear()
+
+
+def _host_slot(url: str, lane: str | None = None):
+    """Connection limiter for url's host. A lane (e.g. DASH audio tracks) gets slots of its own."""
+    host = urlparse(url).netloc
+    key = (host, lane) if lane else host
+    with _host_slots_lock:
+        slot = _host_slots.get(key)
+        if slot is None:
+            slot = _host_slots[key] = BoundedSemaphore(_host_limits["per_host"])
+    return slot
+
+
+def abort_active_transfers() -> None:
+    """Close every in-flight media response so blocked socket reads return right away."""
+    with _active_transfers_lock:
+        responses = list(_active_transfers)
+    for r in responses:
+        try:
+            # close() alone doesn't wake a thread blocked in recv(); shutdown() does
+            sock = getattr(getattr(r.raw, '_connection', None), 'sock', None)
+            if sock is not None:
+                sock.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            pass
+        try:
+            r.close()
+        except Exception:
+            pass
+
+
+def _media_target_filename(url: str, filename_prefix: str = "") -> str:
+    local_filename = url.split('/')[-1].split("?")[0]
+    # Add prefix if provided (useful for gallery ordering)
+    if filename_prefix:
+        local_filename = f"{filename_prefix}_{local_filename}"
+    return local_filename
+
+
+def download_file(url, dest_folder, filename_prefix="", pause_event=None, stop_event=None, session=None, job=None,
+                  filename=None):
+    timeout = (15, 180)
+    attempts = 2
+    last_error = None
+    
+    # Try multiple URLs for Reddit preview links
+    urls_to_try = _try_convert_reddit_preview_url(url)
+    
+    for attempt_url in urls_to_try:
+        if stop_event and stop_event.is_set():
+            return None
+
+        # A planned filename holds for every URL variant, so the file lands where the layout expects it
+        filepath = os.path.join(dest_folder, filename or _media_target_filename(attempt_url, filename_prefix))
+        
+        # Try downloading this URL variant
+        result = _download_single_url(attempt_url, filepath, dest_folder, timeout, attempts, pause_event, stop_event,
+                                      session, job)
+        if result:
+            return result
+        
+        last_error = f"All URL variants failed for {url}"
+    
+    return None
+
+
+def _media_request_headers(url: str) -> dict:
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+    
+    # Set appropriate headers based on the URL
+    if 'redgifs.com' in url:
+        headers['Referer'] = 'https://www.redgifs.com/'
+        headers['Origin'] = 'https://www.redgifs.com'
+        headers['Accept'] = '*/*'
+    elif 'redd.it' in url or 'reddit.com' in url:
+        # Reddit preview URLs need proper referrer and headers
+        headers['Referer'] = 'https://www.reddit.com/'
+        headers['Accept'] = 'image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8'
+        headers['Sec-Fetch-Dest'] = 'image'
+        headers['Sec-Fetch-Mode'] = 'no-cors'
+        headers['Sec-Fetch-Site'] = 'cross-site'
+    return headers
+
+
+# Streaming response bodies into reusable buffers
+_STREAM_MIN_CHUNK = 64 * 1024
+_STREAM_MAX_CHUNK = 4 * 1024 * 1024
+# Size reads so each takes about this long at the observed rate: large enough to keep
+# per-call overhead down, short enough that pause/stop are noticed quickly
+_STREAM_TARGET_SECONDS = 0.1
+_stream_buffers = local()
+
+
+def _stream_buffer(size: int) -> memoryview:
+    """Per-thread receive buffer, reallocated only when a larger chunk size is needed."""
+    view = getattr(_stream_buffers, "view", None)
+    if view is None or len(view) < size:
+        view = _stream_buffers.view = memoryview(bytearray(size))
+    return view
+
+
+def _raw_readinto(r):
+    """readinto() of the underlying http.client response, or None when the body can't be read raw."""
+    fp = getattr(getattr(r, 'raw', None), '_fp', None)
+    if fp is None or not hasattr(fp, 'readinto'):
+        return None
+    # Compressed bodies need urllib3's decoder
+    if r.headers.get('Content-Encoding', 'identity').lower() not in ('identity', ''):
+        return None
+    return fp.readinto
+
+
+# Bandwidth shaping: token buckets for a global cap plus optional per-host and per-job caps.
+# Rates are bytes/second; 0 means unlimited. Limits can change while downloads are running.
+_bandwidth_limits: dict = {"active": False, "global": 0, "hosts": {}, "jobs": {}}
+_bandwidth_buckets: dict = {}  # ("global",) / ("host", netloc) / ("job", id) -> [tokens, last refill]
+_bandwidth_lock = Lock()
+# Burst allowance: a bucket holds at most this many seconds' worth of bytes
+_BANDWIDTH_BURST_SECONDS = 0.25
+# Longest single sleep, so pause/stop are noticed while a thread pays off its debt
+_BANDWIDTH_MAX_SLEEP = 0.25
+
+
+def parse_rate(text) -> int:
+    """'5M', '750k', '2.5MB/s', '0' or 'off' -> bytes per second (0 = unlimited)."""
+    value = str(text or "").strip().lower()
+    if value in ("", "off", "none", "unlimited"):
+        return 0
+    m = re.fullmatch(r'([\d.]+)\s*([kmg]?)(?:i?b)?(?:/s)?', value)
+    if not m:
+        raise ValueError(f"Invalid rate: {text!r} (use e.g. 500K, 5M, 1.5G)")
+    scale = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}[m.group(2)]
+    return int(float(m.group(1)) * scale)
+
+
+def format_rate(rate: int) -> str:
+    if not rate:
+        return "unlimited"
+    for unit, scale in (("GB/s", 1024 ** 3), ("MB/s", 1024 ** 2), ("KB/s", 1024)):
+        if rate >= scale:
+            return f"{rate / scale:.1f} {unit}"
+    return f"{rate} B/s"
+
+
+def set_bandwidth_limit(rate: int, host: str | None = None, job=None) -> None:
+    """Cap download speed globally, for one media host, or for one job. rate=0 removes the cap."""
+    rate = max(0, int(rate or 0))
+    with _bandwidth_lock:
+        if host:
+            limits, key = _bandwidth_limits["hosts"], host
+        elif job is not None:
+            limits, key = _bandwidth_limits["jobs"], job
+        else:
+            limits, key = None, None
+            _bandwidth_limits["global"] = rate
+        if limits is not None:
+            if rate:
+                limits[key] = rate
+            else:
+                limits.pop(key, None)
+        _bandwidth_limits["active"] = bool(_bandwidth_limits["global"] or _bandwidth_limits["hosts"]
+                                           or _bandwidth_limits["jobs"])
+
+
+def _bandwidth_caps(host, job) -> list:
+    caps = []
+    if _bandwidth_limits["global"]:
+        caps.append((("global",), _bandwidth_limits["global"]))
+    rate = _bandwidth_limits["hosts"].get(host)
+    if rate:
+        caps.append((("host", host), rate))
+    rate = _bandwidth_limits["jobs"].get(job) if job is not None else None
+    if rate:
+        caps.append((("job", job), rate))
+    return caps
+
+
+def _bandwidth_chunk_limit(host, job) -> int:
+    """Largest read that keeps shaped transfers smooth (0 when no cap applies)."""
+    if not _bandwidth_limits["active"]:
+        return 0
+    rates = [rate for _, rate in _bandwidth_caps(host, job)]
+    return int(min(rates) * _STREAM_TARGET_SECONDS) if rates else 0
+
+
+def _throttle_bandwidth(nbytes: int, host, job, interrupted) -> bool:
+    """Charge nbytes against every cap that applies and sleep off any debt.
+
+    Buckets may go negative, so a thread that just read a large chunk waits for it instead
+    of the next reader; concurrent threads share each bucket and together stay under its
+    rate. Returns False if interrupted() fired while sleeping.
+    """
+    if not _bandwidth_limits["active"]:
+        return True
+    delay = 0.0
+    with _bandwidth_lock:
+        now = time.monotonic()
+        for key, rate in _bandwidth_caps(host, job):
+            bucket = _bandwidth_buckets.get(key)
+            if bucket is None:
+                bucket = _bandwidth_buckets[key] = [rate * _BANDWIDTH_BURST_SECONDS, now]
+            tokens = min(rate * _BANDWIDTH_BURST_SECONDS, bucket[0] + (now - bucket[1]) * rate) - nbytes
+            bucket[0], bucket[1] = tokens, now
+            if tokens < 0:
+                delay = max(delay, -tokens / rate)
+    deadline = time.monotonic() + delay
+    while delay > 0:
+        time.sleep(min(delay, _BANDWIDTH_MAX_SLEEP))
+        if interrupted():
+            return False
+        delay = deadline - time.monotonic()
+    return True
+
+
+def _write_response_body(r, f, interrupted, host=None, job=None) -> bool:
+    """Copy a streaming response body into f. Returns False if interrupted() asked to stop early.
+
+    host and job select which bandwidth caps apply to this transfer.
+    """
+    readinto = _raw_readinto(r)
+    if readinto is None:
+        for chunk in r.iter_content(chunk_size=1024 * 256):
+            if not chunk:
+                continue
+            f.write(chunk)
+            if interrupted() or not _throttle_bandwidth(len(chunk), host, job, interrupted):
+                return False
+        return True
+
+    # Read straight from the socket buffer into one reused bytearray instead of a new bytes per chunk
+    chunk_size = _STREAM_MIN_CHUNK
+    buf = _stream_buffer(chunk_size)
+    while True:
+        # Under a cap, keep reads small so the link sees a steady rate rather than line-rate bursts
+        shaped = _bandwidth_chunk_limit(host, job)
+        size = min(chunk_size, max(shaped, 4096)) if shaped else chunk_size
+        started = time.perf_counter()
+        n = readinto(buf[:size])
+        if not n:
+            break
+        f.write(buf[:n])
+        if interrupted():
+            return False
+        if shaped:
+            if not _throttle_bandwidth(n, host, job, interrupted):
+                return False
+        elif n == chunk_size:
+            rate = n / max(time.perf_counter() - started, 1e-4)
+            chunk_size = min(max(int(rate * _STREAM_TARGET_SECONDS) // _STREAM_MIN_CHUNK * _STREAM_MIN_CHUNK,
+                                 _STREAM_MIN_CHUNK), _STREAM_MAX_CHUNK)
+            buf = _stream_buffer(chunk_size)
+    # http.client's readinto() reports a connection closed before Content-Length as a plain
+    # end of body; treat the shortfall as an error so the .part file is resumed, not kept as done
+    remaining = getattr(readinto.__self__, 'length', None)
+    if remaining:
+        raise IOError(f"Connection closed with {remaining} bytes of the body still to come")
+    # The body was read past urllib3, so hand the connection back to the pool ourselves;
+    # otherwise closing the response would drop a perfectly reusable keep-alive connection
+    r.raw.release_conn()
+    return True
+
+
+# Pluggable transport for media downloads: requests (HTTP/1.1) or httpx (HTTP/2)
+_transport_state: dict = {"name": "http1", "client": None, "http1_hosts": set()}
+_transport_lock = Lock()
+
+
+def set_http_transport(name: str, log_callback=None, max_connections: int = 20, prior_knowledge: bool = False) -> str:
+    """Choose how media files are fetched and return the transport actually in use.
+
+    'http1' uses requests. 'http2' uses a shared httpx client that multiplexes many files over
+    a few connections per host; servers that only speak HTTP/1.1 are handled through ALPN, and
+    hosts that break HTTP/2 fall back to requests. prior_knowledge speaks HTTP/2 over plain
+    http:// (h2c), which is only useful against local test servers.
+    """
+    with _transport_lock:
+        old_client = _transport_state["client"]
+        _transport_state.update(name="http1", client=None)
+        _transport_state["http1_hosts"].clear()
+        if name == "http2":
+            if importlib.util.find_spec("httpx") is None or importlib.util.find_spec("h2") is None:
+                if log_callback:
+                    log_callback("HTTP/2 needs httpx and h2 (pip install httpx[http2]); using HTTP/1.1.")
+            else:
+                import httpx
+                limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+                _transport_state["client"] = httpx.Client(http2=True, http1=not prior_knowledge,
+                                                          follow_redirects=True, limits=limits)
+                _transport_state["name"] = "http2"
+    if old_client is not None:
+        old_client.close()
+    return _transport_state["name"]
+
+
+class _Http2Response:
+    """The parts of requests.Response that the download loop uses, over an httpx streaming response."""
+    raw = None
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    def raise_for_status(self):
+        self._response.raise_for_status()
+
+    def iter_content(self, chunk_size):
+        return self._response.iter_bytes(chunk_size)
+
+    def close(self):
+        self._response.close()
+
+
+@contextmanager
+def _open_media_stream(url, headers, timeout, session=None):
+    """Stream a GET of url through the active transport."""
+    client = _transport_state["client"]
+    host = urlparse(url).netloc
+    if client is not None and host not in _transport_state["http1_hosts"]:
+        import httpx
+        stream = client.stream("GET", url, headers=headers, timeout=httpx.Timeout(timeout[1], connect=timeout[0]))
+        try:
+            response = stream.__enter__()
+        except httpx.ProtocolError:
+            # The host mishandles HTTP/2: use HTTP/1.1 for it from now on
+            _transport_state["http1_hosts"].add(host)
+            response = None
+        if response is not None:
+            try:
+                yield _Http2Response(response)
+            finally:
+                stream.__exit__(None, None, None)
+            return
+
+    import requests
+    with (session or requests).get(url, stream=True, headers=headers, timeout=timeout) as r:
+        yield r
+
+
+def _download_single_url(url, filepath, dest_folder, timeout, attempts, pause_event=None, stop_event=None, session=None,
+                         job=None, lane=None):
+    """Helper function to download a single URL.
+
+    Data goes to '<filepath>.part' and is renamed when complete. A pause mid-transfer
+    closes the connection and resumes later with a Range request; a stop leaves the
+    .part file in place so the next run picks up where this one left off.
+    """
+    headers = _media_request_headers(url)
+
+    part_path = filepath + ".part"
+    validator = None  # ETag/Last-Modified of the partial data, sent as If-Range on resume
+    failures = 0
+    while failures < attempts:
+        if not _wait_if_paused(pause_event, stop_event):
+            return None
+        request_headers = dict(headers)
+        try:
+            offset = os.path.getsize(part_path)
+        except OSError:
+            offset = 0
+        if offset:
+            request_headers['Range'] = f"bytes={offset}-"
+            if validator:
+                request_headers['If-Range'] = validator
+        interrupted = False
+        try:
+            _ensure_dir(dest_folder)
+            with _host_slot(url, lane), _open_media_stream(url, request_headers, timeout, session) as r:
+                with _active_transfers_lock:
+                    _active_transfers.add(r)
+                try:
+                    if offset and r.status_code == 416:
+                        # Nothing left past our offset: the .part file already holds the whole body
+                        total = r.headers.get('Content-Range', '').rpartition('/')[2]
+                        if total.isdigit() and int(total) == offset:
+                            os.replace(part_path, filepath)
+                            return filepath
+                        os.remove(part_path)
+                        continue
+                    r.raise_for_status()
+                    if offset and (r.status_code != 206 or not r.headers.get('Content-Range', '').startswith(f"bytes {offset}-")):
+                        # Server ignored the Range (or the file changed): start over
+                        offset = 0
+                    validator = r.headers.get('ETag') or r.headers.get('Last-Modified') or validator
+                    with _open_in_dir(part_path, 'ab' if offset else 'wb', dest_folder) as f:
+                        interrupted = not _write_response_body(
+                            r, f, lambda: (stop_event and stop_event.is_set()) or (pause_event and pause_event.is_set()),
+                            urlparse(url).netloc, job)
+                finally:
+                    with _active_transfers_lock:
+                        _active_transfers.discard(r)
+            if interrupted:
+                if stop_event and stop_event.is_set():
+                    return None
+                # Paused: the connection is released; loop back, wait, then resume from the .part size
+                continue
+            # Verify file was created and has content
+            if os.path.getsize(part_path) > 0:
+                os.replace(part_path, filepath)
+                return filepath
+            else:
+                os.remove(part_path)
+                return None
+        except Exception as e:
+            if stop_event and stop_event.is_set():
+                # Aborted by abort_active_transfers(); keep the partial file for the next run
+                return None
+            failures += 1
+    
+    try:
+        os.remove(part_path)
+    except OSError:
+        pass
+    # Return None if all attempts failed
+    return None
+
+# Reddit-hosted video: DASH video and audio tracks fetched together, muxed in the background
+_mux_state: dict = {"executor": None, "tracks": None, "pending": set()}
+_mux_lock = Lock()
+# Muxing only copies streams, so a couple of threads driving ffmpeg keep up with many downloads
+_MUX_WORKERS = 2
+
+
+def _parse_dash_manifest(xml_text: str, manifest_url: str) -> tuple[str | None, str | None]:
+    """Pick the highest-bandwidth video and audio representations. Returns (video_url, audio_url)."""
+    import xml.etree.ElementTree as ET
+
+    best: dict[str, tuple[int, str]] = {}
+    for adaptation in ET.fromstring(xml_text).iter():
+        if not adaptation.tag.endswith('AdaptationSet'):
+            continue
+        set_kind = (adaptation.get('contentType') or adaptation.get('mimeType') or '').split('/')[0]
+        for rep in adaptation:
+            if not rep.tag.endswith('Representation'):
+                continue
+            kind = set_kind or (rep.get('mimeType') or '').split('/')[0]
+            base = next((el.text.strip() for el in rep if el.tag.endswith('BaseURL') and el.text), None)
+            if kind not in ('video', 'audio') or not base:
+                continue
+            bandwidth = int(rep.get('bandwidth') or 0)
+            if kind not in best or bandwidth > best[kind][0]:
+                best[kind] = (bandwidth, urljoin(manifest_url, base))
+    return best.get('video', (0, None))[1], best.get('audio', (0, None))[1]
+
+
+def _submit_mux(task, *args):
+    with _mux_lock:
+        if _mux_state["executor"] is None:
+            _mux_state["executor"] = ThreadPoolExecutor(max_workers=_MUX_WORKERS, thread_name_prefix="mux")
+        future = _mux_state["executor"].submit(task, *args)
+        _mux_state["pending"].add(future)
+    future.add_done_callback(lambda f: _mux_state["pending"].discard(f))
+    return future
+
+
+def _submit_track(url, filepath, dest_folder, timeout, pause_event, stop_event, session, job):
+    # Audio tracks download on their own small pool, alongside the video on the calling thread
+    with _mux_lock:
+        if _mux_state["tracks"] is None:
+            _mux_state["tracks"] = ThreadPoolExecutor(max_workers=8, thread_name_prefix="track")
+        executor = _mux_state["tracks"]
+    # Its own host lane: videos hold their slots for the whole transfer, and audio queued behind
+    # them would no longer overlap with the video it belongs to
+    return executor.submit(_download_single_url, url, filepath, dest_folder, timeout, 2,
+                           pause_event, stop_event, session, job, "audio")
+
+
+def wait_for_muxing() -> None:
+    """Block until every queued mux has finished. Call before finishing the transcode and media check stages."""
+    while True:
+        with _mux_lock:
+            pending = list(_mux_state["pending"])
+        if not pending:
+            return
+        futures_wait(pending)
+
+
+def _mux_reddit_video(ffmpeg: str, video_path: str, audio_path: str, target: str, on_saved, log_callback) -> None:
+    try:
+        _run_ffmpeg(ffmpeg, ["-i", video_path, "-i", audio_path, "-map", "0:v:0", "-map", "1:a:0", "-c", "copy",
+                             "-movflags", "+faststart", "-f", "mp4", target + ".part"])
+        os.replace(target + ".part", target)
+        os.remove(video_path)
+    except Exception as e:
+        log_callback(f"  ✗ Muxing failed for {target} ({e}); kept the video without sound.")
+        # A leftover .part would make a later download of target resume from ffmpeg's partial output
+        try:
+            os.remove(target + ".part")
+        except OSError:
+            pass
+        os.replace(video_path, target)
+    try:
+        os.remove(audio_path)
+    except OSError:
+        pass
+    on_saved(target)
+
+
+def download_reddit_video(manifest_url: str, dest_folder: str, filename: str, log_callback, on_saved,
+                          pause_event=None, stop_event=None, session=None, job=None) -> str | None:
+    """Download a v.redd.it video with its sound. Returns the target path, or None if the DASH route failed.
+
+    The video and audio tracks download at the same time (each with pause/resume like any other file),
+    then ffmpeg joins them on a background thread so this download thread can move on. on_saved(path)
+    runs once the final file is in place, which may be after this returns.
+    """
+    import requests
+
+    try:
+        resp = (session or requests).get(manifest_url, headers=_media_request_headers(manifest_url), timeout=(15, 30))
+        resp.raise_for_status()
+        video_url, audio_url = _parse_dash_manifest(resp.text, manifest_url)
+    except Exception as e:
+        log_callback(f"  DASH manifest unavailable ({e}); falling back to the video-only stream.")
+        return None
+    if not video_url:
+        return None
+
+    target = os.path.join(dest_folder, filename)
+    timeout = (15, 180)
+    ffmpeg = shutil.which("ffmpeg")
+    if audio_url and not ffmpeg:
+        log_callback("  ffmpeg not found: saving the video without sound.")
+        audio_url = None
+
+    audio_future = None
+    if audio_url:
+        audio_future = _submit_track(audio_url, target + ".audio", dest_folder, timeout, pause_event, stop_event,
+                                     session, job)
+    if audio_url and os.path.exists(target + ".video"):
+        # Finished on a run that was stopped while the audio track was still downloading
+        video_path = target + ".video"
+    else:
+        video_path = _download_single_url(video_url, target + ".video" if audio_url else target, dest_folder, timeout,
+                                          2, pause_event, stop_event, session, job)
+    audio_path = audio_future.result() if audio_future is not None else None
+    if video_path is None:
+        if audio_path is not None:
+            # The caller falls back to the video-only stream; a finished audio track has no use there
+            try:
+                os.remove(audio_path)
+            except OSError:
+                pass
+        return None
+    if audio_path is None:
+        if audio_url:
+            if stop_event and stop_event.is_set():
+                # Keep the finished video track for the next run rather than saving it without sound
+                return None
+            # Some videos list an audio track that was never uploaded (e.g. GIF-style posts)
+            log_callback(f"  ⚠ Audio track could not be downloaded; saved {target} without sound.")
+            os.replace(video_path, target)
+        on_saved(target)
+        return target
+    log_callback(f"  ⧗ Muxing video and sound into {target}")
+    _submit_mux(_mux_reddit_video, ffmpeg, video_path, audio_path, target, on_saved, log_callback)
+    return target
+
+
+def parse_cookie_string_to_dict(cookies_str: str) -> dict:
+    # Accept either raw cookie string or a full "Cookie: a=b; c=d" header
+    if cookies_str.lower().startswith("cookie:"):
+        cookies_str = cookies_str.split(":", 1)[1]
+    cookies: dict[str, str] = {}
+    for part in cookies_str.split(';'):
+        if '=' not in part:
+            continue
+        key, value = part.strip().split('=', 1)
+        # Skip cookie attributes that sometimes get included by exporters
+        if key.lower() in {"path", "domain", "expires", "max-age", "secure", "httponly", "samesite"}:
+            continue
+        cookies[key] = value
+    return cookies
+
+
+_OTHER_USER_LISTINGS = ('upvoted', 'downvoted', 'submitted', 'hidden', 'gilded')
+
+
+def normalize_saved_url_to_old_reddit(url: str) -> str:
+    parsed = urlparse(url)
+    netloc = parsed.netloc or "www.reddit.com"
+    if "reddit.com" not in netloc:
+        raise ValueError("URL must be a reddit.com URL")
+    # Force old.reddit.com for server-rendered pages
+    netloc = "old.reddit.com"
+    path = parsed.path
+    if not path.endswith('/'):
+        path = path + '/'
+    # Ensure it points to /saved/ (other user listings like /upvoted/ are kept as they are)
+    if "/saved/" not in path and not any(f"/{listing}/" in path for listing in _OTHER_USER_LISTINGS):
+        if path.endswith("/saved/"):
+            pass
+        elif path.endswith("/saved/") is False and path.rstrip('/').endswith('/saved') is False:
+            if path.endswith('/'):
+                path = path + "saved/"
+            else:
+                path = path + "/saved/"
+    new_parsed = parsed._replace(netloc=netloc, path=path, params='', query='', fragment='')
+    return urlunparse(new_parsed)
+
+
+_redgifs_auth_cache: dict = {"token": None, "fetched_at": 0}
+
+
+def _get_redgifs_token(headers: dict, log_callback, session=None) -> str | None:
+    import requests
+    now = time.time()
+    token = _redgifs_auth_cache.get('token')
+    if token and (now - _redgifs_auth_cache.get('fetched_at', 0)) < 60 * 30:
+        return token
+    try:
+        resp = (session or requests).get('https://api.redgifs.com/v2/auth/temporary', headers=headers, timeout=15)
+        resp.raise_for_status()
+        j = resp.json()
+        token = j.get('token') or (j.get('data') or {}).get('token')
+        if token:
+            _redgifs_auth_cache['token'] = token
+            _redgifs_auth_cache['fetched_at'] = now
+            return token
+    except Exception as e:
+        log_callback(f"Failed to auth with Redgifs: {e}")
+    return None
+
+
+def _extract_redgifs_id_from_url(url: str) -> str | None:
+    try:
+        p = urlparse(url)
+        if 'redgifs.com' not in p.netloc and 'gifdeliverynetwork.com' not in p.netloc and 'gfycat.com' not in p.netloc:
+            return None
+        parts = [seg for seg in p.path.split('/') if seg]
+        if not parts:
+            return None
+        if parts[0] in {'watch', 'ifr'} and len(parts) >= 2:
+            return parts[1]
+        return parts[-1]
+    except Exception:
+        return None
+
+
+def _resolve_redgifs_direct_urls(url: str, headers: dict, log_callback, session=None) -> list[str]:
+    import requests
+
+    if 'gfycat.com' in url:
+        try:
+            p = urlparse(url)
+            parts = [seg for seg in p.path.split('/') if seg]
+            gif_id = parts[1] if parts and parts[0] == 'ifr' and len(parts) > 1 else (parts[0] if parts else None)
+            if gif_id:
+                url = f"https://redgifs.com/ifr/{gif_id}"
+        except Exception:
+            pass
+
+    gid = _extract_redgifs_id_from_url(url)
+    if not gid:
+        return []
+    token = _get_redgifs_token(headers, log_callback, session)
+    if not token:
+        return []
+    try:
+        api_headers = dict(headers)
+        api_headers['Authorization'] = f"Bearer {token}"
+        resp = (session or requests).get(f'https://api.redgifs.com/v2/gifs/{gid}', headers=api_headers, timeout=20)
+        resp.raise_for_status()
+        data = resp.json()
+        gif = data.get('gif') or data.get('result') or data.get('data') or {}
+        urls = gif.get('urls') or {}
+        candidates = [urls.get('hd'), urls.get('sd'), urls.get('gif')]
+        return [u for u in candidates if isinstance(u, str)]
+    except Exception as e:
+        log_callback(f"Failed to resolve Redgifs {gid}: {e}")
+        return []
+
+
+def _convert_imgur_gifv_to_mp4(url: str) -> str:
+    if url.lower().endswith('.gifv') and 'imgur.com' in url:
+        return url[:-5] + '.mp4'
+    return url
+
+
+def _try_convert_reddit_preview_url(url: str) -> list[str]:
+    """
+    Convert Reddit preview URLs to potential direct media URLs.
+    Reddit preview URLs often return 403, but direct media URLs work.
+    """
+    if not ('preview.redd.it' in url or 'external-preview.redd.it' in url):
+        return [url]
+    
+    urls_to_try = [url]  # Always try original first
+    
+    try:
+        # Try converting preview.redd.it to i.redd.it (direct media)
+        if 'preview.redd.it' in url:
+            direct_url = url.replace('preview.redd.it', 'i.redd.it')
+            urls_to_try.append(direct_url)
+        
+        # Try removing preview parameters
+        if '?' in url:
+            clean_url = url.split('?')[0]
+            if clean_url != url:
+                urls_to_try.append(clean_url)
+                # Also try the i.redd.it version of the clean URL
+                if 'preview.redd.it' in clean_url:
+                    direct_clean = clean_url.replace('preview.redd.it', 'i.redd.it')
+                    urls_to_try.append(direct_clean)
+    
+    except Exception:
+        pass
+    
+    return urls_to_try
+
+
+def extract_media_urls_from_post_data(post_data: dict, headers: dict, log_callback, session=None) -> list[str]:
+    media_urls: list[str] = []
+
+    # Direct media link overrides
+    url_overridden = post_data.get('url_overridden_by_dest') or post_data.get('url')
+    if isinstance(url_overridden, str):
+        cleaned = url_overridden.split('?')[0]
+        lower = cleaned.lower()
+        if 'redgifs.com' in lower or 'gifdeliverynetwork.com' in lower or 'gfycat.com' in lower:
+            media_urls.extend(_resolve_redgifs_direct_urls(cleaned, headers, log_callback, session))
+        else:
+            if lower.endswith('.gifv') and 'imgur.com' in lower:
+                cleaned = _convert_imgur_gifv_to_mp4(cleaned)
+            if any(lower.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp4']):
+                media_urls.append(cleaned)
+
+    # Reddit-hosted gallery
+    if post_data.get('is_gallery') and isinstance(post_data.get('media_metadata'), dict):
+        media_metadata = post_data['media_metadata']
+        gallery_data = post_data.get('gallery_data', {})
+        gallery_items = gallery_data.get('items', []) if isinstance(gallery_data, dict) else []
+        
+        # Use gallery_data order if available, otherwise use media_metadata keys
+        if gallery_items:
+            # Process in the order specified by gallery_data
+            for gallery_item in gallery_items:
+                if not isinstance(gallery_item, dict):
+                    continue
+                media_id = gallery_item.get('media_id')
+                if not media_id or media_id not in media_metadata:
+                    continue
+                item = media_metadata[media_id]
+                if not isinstance(item, dict):
+                    continue
+                
+                # Extract URL and decode HTML entities
+                url = None
+                # Prefer source (original) quality over preview
+                source = item.get('s') or {}
+                url = source.get('u') or source.get('url')
+                
+                # If no source URL, try the highest resolution preview
+                if not url:
+                    previews = item.get('p') or []
+                    if previews:
+                        best = previews[-1]
+                        url = best.get('u') or best.get('url')
+                
+                if url:
+                    # Decode HTML entities in URLs (Reddit sometimes encodes &amp; etc.)
+                    import html as html_module
+                    url = html_module.unescape(url)
+                    media_urls.append(url.split('?')[0])
+        else:
+            # Fallback: process all media_metadata items (no guaranteed order)
+            for item in media_metadata.values():
+                if not isinstance(item, dict):
+                    continue
+                # Prefer source (original) quality over preview
+                url = None
+                source = item.get('s') or {}
+                url = source.get('u') or source.get('url')
+                
+                # If no source URL, try the highest resolution preview
+                if not url:
+                    previews = item.get('p') or []
+                    if previews:
+                        best = previews[-1]
+                        url = best.get('u') or best.get('url')
+                
+                if url:
+                    # Decode HTML entities in URLs
+                    import html as html_module
+                    url = html_module.unescape(url)
+                    media_urls.append(url.split('?')[0])
+
+    # Reddit-hosted videos
+    secure_media = post_data.get('secure_media') or {}
+    if isinstance(secure_media, dict):
+        reddit_video = secure_media.get('reddit_video') or {}
+        if isinstance(reddit_video, dict):
+            fallback_url = reddit_video.get('fallback_url')
+            if isinstance(fallback_url, str):
+                media_urls.append(fallback_url.split('?')[0])
+        oembed = secure_media.get('oembed') or {}
+        if isinstance(oembed, dict):
+            html = oembed.get('html') or ''
+            if isinstance(html, str) and ('redgifs.com' in html or 'gfycat.com' in html or 'imgur.com' in html):
+                try:
+                    from bs4 import BeautifulSoup
+                    soup = BeautifulSoup(html, 'html.parser')
+                    iframe = soup.find('iframe')
+                    if iframe and iframe.get('src'):
+                        src = iframe['src']
+                        lower = src.lower()
+                        if 'redgifs.com' in lower or 'gfycat.com' in lower:
+                            media_urls.extend(_resolve_redgifs_direct_urls(src, headers, log_callback, session))
+                        elif lower.endswith('.gifv') and 'imgur.com' in lower:
+                            media_urls.append(_convert_imgur_gifv_to_mp4(src))
+                except Exception:
+                    pass
+
+    # De-duplicate
+    unique_urls = []
+    seen = set()
+    for u in media_urls:
+        if u not in seen:
+            unique_urls.append(u)
+            seen.add(u)
+    return unique_urls
+
+
+_host_next_request: dict = {}
+_host_next_request_lock = Lock()
+
+
+def _wait_for_host_turn(host: str, min_interval: float, stop_event=None) -> bool:
+    """Space requests to one host at least min_interval apart across all threads. Returns False if stopped."""
+    with _host_next_request_lock:
+        now = time.monotonic()
+        turn = max(now, _host_next_request.get(host, 0))
+        _host_next_request[host] = turn + min_interval
+    delay = turn - now
+    if delay > 0:
+        if stop_event is not None:
+            return not stop_event.wait(delay)
+        time.sleep(delay)
+    return not (stop_event is not None and stop_event.is_set())
+
+
+def fetch_all_saved_items_json(saved_url: str, headers: dict, cookies: dict, log_callback, stop_event=None, page_callback=None) -> list[dict]:
+    import requests
+
+    items: list[dict] = []
+    after: str | None = None
+
+    # Build base JSON endpoint
+    # Example: https://old.reddit.com/user/<username>/saved/.json?limit=100&raw_json=1
+    while True:
+        params = {
+            'limit': '100',
+            'raw_json': '1',
+        }
+        if after:
+            params['after'] = after
+
+        json_url = saved_url.rstrip('/') + '/.json'
+        # Be polite and avoid hammering the server (shared across concurrent jobs)
+        if not _wait_for_host_turn(urlparse(json_url).netloc, 0.6, stop_event):
+            break
+        try:
+            resp = requests.get(json_url, headers=headers, cookies=cookies, params=params, timeout=30)
+            if resp.status_code in (401, 403):
+                log_callback("Authentication failed. Make sure your cookie header is from a logged-in session.")
+                break
+            resp.raise_for_status()
+        except Exception as e:
+            log_callback(f"Error fetching JSON: {e}")
+            break
+
+        try:
+            data = resp.json()
+        except json.JSONDecodeError:
+            log_callback("Failed to parse JSON. Your cookies may be invalid or you were redirected to a login page.")
+            break
+
+        if not isinstance(data, dict) or 'data' not in data or 'children' not in data['data']:
+            log_callback("No saved items found or unexpected response structure.")
+            break
+
+        children = data['data']['children']
+        if not children:
+            break
+
+        items.extend(children)
+        after = data['data'].get('after')
+        log_callback(f"Fetched {len(children)} saved items (total: {len(items)}).")
+        if page_callback is not None:
+            page_callback(children)
+
+        # Stop if no more pages
+        if not after:
+            break
+
+    return items
+
+
+def _resolve_post_media(post: dict, headers: dict, cookies: dict, log_callback, session=None) -> list[str]:
+    media_links = extract_media_urls_from_post_data(post, headers, log_callback, session)
+    if not media_links:
+        # Fallback to minimal HTML scrape for any obvious direct links when JSON lacks media
+        permalink = post.get('permalink')
+        if permalink:
+            try:
+                import requests
+                from bs4 import BeautifulSoup
+                html_url = 'https://old.reddit.com' + permalink
+                resp = (session or requests).get(html_url, headers=headers, cookies=cookies, timeout=30)
+                if resp.ok:
+                    soup = BeautifulSoup(resp.text, 'html.parser')
+                    media_links = get_media_links_from_post_html(soup)
+            except Exception:
+                pass
+    return media_links
+
+
+def _media_kind(url: str, is_gallery: bool = False) -> str:
+    """Coarse media type of a resolved URL, used to guess its size before any request is made."""
+    path = url.split('?')[0].lower()
+    host = urlparse(path).netloc
+    if host == 'v.redd.it':
+        return "reddit_video"
+    if host.endswith('redgifs.com'):
+        return "redgifs"
+    if path.endswith(('.mp4', '.webm', '.mov')):
+        return "video"
+    if path.endswith('.gif'):
+        return "gif"
+    return "gallery_image" if is_gallery else "image"
+
+
+def _reddit_video_info(post: dict) -> dict:
+    video = (post.get('secure_media') or {}).get('reddit_video') or {}
+    return video if isinstance(video, dict) else {}
+
+
+def _reddit_video_estimate(post: dict) -> int | None:
+    # Reddit reports duration and bitrate for its own videos, which pins the size down well
+    video = _reddit_video_info(post)
+    if video.get('duration') and video.get('bitrate_kbps'):
+        return int(video['duration'] * video['bitrate_kbps'] * 1000 / 8)
+    return None
+
+
+def _plan_post(post: dict, idx: int, output_dir: str, headers: dict, cookies: dict, log_callback, session=None,
+               layout=None) -> dict:
+    """Resolve one listing item into a plan entry: target folder plus media URLs."""
+    post_title = clean_filename(post.get('title') or post.get('name') or f'post_{idx}')
+    folder = _assign_post_folder(layout, post.get('name'), post_title)
+    log_callback(f"Processing post: '{post_title}' -> {os.path.join(output_dir, folder)}")
+    media_links = _resolve_post_media(post, headers, cookies, log_callback, session)
+    is_gallery = bool(post.get('is_gallery', False))
+    media = []
+    for u in media_links:
+        item = {"url": u, "kind": _media_kind(u, is_gallery)}
+        if item["kind"] == "reddit_video":
+            item["estimate"] = _reddit_video_estimate(post)
+            # fallback_url is video only; the DASH manifest also lists the sound track
+            dash_url = _reddit_video_info(post).get('dash_url')
+            if isinstance(dash_url, str) and urlparse(dash_url).netloc == 'v.redd.it':
+                item["dash_url"] = dash_url
+        media.append(item)
+    entry = {
+        "name": post.get('name'),
+        "title": post_title,
+        "folder": folder,
+        "is_gallery": is_gallery,
+        "created": post.get('created_utc') or 0,
+        "media": media,
+    }
+    _unique_media_filenames(entry)
+    return entry
+
+
+# Output layout: collision-free target paths, decided before anything is downloaded
+LAYOUT_INDEX_FILENAME = ".layout_index.json"
+# Save the post -> folder index after this many new assignments, so a crash can't reshuffle names
+_LAYOUT_SAVE_EVERY = 100
+_known_dirs: set = set()
+_known_dirs_lock = Lock()
+
+
+def _ensure_dir(path: str) -> None:
+    """os.makedirs, but only the first time a folder is seen in this process."""
+    if path in _known_dirs:
+        return
+    os.makedirs(path, exist_ok=True)
+    with _known_dirs_lock:
+        _known_dirs.add(path)
+
+
+def _open_in_dir(path: str, mode: str, folder: str):
+    """open() a file in folder, recreating the folder if it was removed after _ensure_dir cached it."""
+    try:
+        return open(path, mode)
+    except FileNotFoundError:
+        with _known_dirs_lock:
+            _known_dirs.discard(folder)
+        _ensure_dir(folder)
+        return open(path, mode)
+
+
+def load_output_layout(output_dir: str, readonly: bool = False) -> dict:
+    """Index the output folder once: which post owns which folder, and which folders already exist.
+
+    A readonly layout (dry runs) still avoids collisions but never writes the index file.
+    """
+    posts: dict = {}
+    try:
+        with open(os.path.join(output_dir, LAYOUT_INDEX_FILENAME), 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if isinstance(saved, dict) and isinstance(saved.get('posts'), dict):
+            posts = saved['posts']
+    except (OSError, ValueError):
+        pass
+    # One directory listing instead of an exists()/makedirs() per file
+    existing = []
+    try:
+        with os.scandir(output_dir) as entries:
+            existing = [entry.name for entry in entries if entry.is_dir()]
+    except OSError:
+        pass
+    with _known_dirs_lock:
+        # Folders cached by an earlier run in this process (the GUI) may have been deleted since
+        prefix = os.path.join(output_dir, "")
+        _known_dirs.difference_update([path for path in _known_dirs
+                                       if path == output_dir or path.startswith(prefix)])
+        _known_dirs.update(os.path.join(output_dir, name) for name in existing)
+    return {
+        "output_dir": output_dir,
+        "posts": posts,
+        # Windows and macOS folders are case-insensitive, so ownership is tracked by lowercased name
+        "owners": {folder.lower(): name for name, folder in posts.items()},
+        "lock": Lock(),
+        "unsaved": 0,
+        "readonly": readonly,
+    }
+
+
+def save_output_layout(layout: dict | None) -> None:
+    if layout is None or layout["readonly"]:
+        return
+    path = os.path.join(layout["output_dir"], LAYOUT_INDEX_FILENAME)
+    with layout["lock"]:
+        data = {"version": 1, "posts": dict(layout["posts"])}
+        layout["unsaved"] = 0
+    try:
+        _ensure_dir(layout["output_dir"])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _unique_media_filenames(entry: dict) -> None:
+    # Same basename from two hosts (or two variants of one image) would overwrite each other
+    gallery = entry["is_gallery"] and len(entry["media"]) > 1
+    taken = set()
+    for media_idx, item in enumerate(entry["media"], 1):
+        filename = item.get("filename")
+        if filename:
+            # Stored names come from plan files and queue brokers: keep them inside the post folder
+            filename = item["filename"] = clean_filename(os.path.basename(filename.replace('\\', '/')))
+        else:
+            url = item.get("resolved_url") or item["url"]
+            filename = _media_target_filename(url, f"{media_idx:02d}" if gallery else "") or f"media_{media_idx:02d}"
+            if filename.lower() in taken:
+                import hashlib
+                stem, ext = os.path.splitext(filename)
+                filename = f"{stem}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}{ext}"
+            item["filename"] = filename
+        taken.add(filename.lower())
+
+
+def _assign_post_folder(layout: dict | None, name: str | None, title: str) -> str:
+    """Folder for one post: the one it got on an earlier run, else its title, else '<title> [<post id>]'.
+
+    Existing folders that aren't in the index yet (archives from before it existed) go to the
+    first post that asks for them.
+    """
+    folder = clean_filename(title)
+    if layout is None or not name:
+        return folder
+    with layout["lock"]:
+        if name in layout["posts"]:
+            return layout["posts"][name]
+        owner = layout["owners"].get(folder.lower())
+        if owner is not None and owner != name:
+            suffix = f" [{name.split('_', 1)[-1]}]"
+            folder = clean_filename(folder[:100 - len(suffix)].rstrip() + suffix)
+            n = 2
+            while layout["owners"].get(folder.lower(), name) != name:
+                folder = clean_filename(f"{folder[:90]} {n}")
+                n += 1
+        layout["posts"][name] = folder
+        layout["owners"][folder.lower()] = name
+        layout["unsaved"] += 1
+        save_now = layout["unsaved"] >= _LAYOUT_SAVE_EVERY
+    if save_now:
+        save_output_layout(layout)
+    return folder
+
+
+def assign_post_layout(layout: dict | None, entry: dict) -> dict:
+    """Give an entry (e.g. from a saved plan) a folder no other post uses and distinct filenames."""
+    entry["folder"] = _assign_post_folder(layout, entry.get("name"), entry["title"])
+    _unique_media_filenames(entry)
+    return entry
+
+
+def reserve_post_folders(layout: dict | None, children: list) -> None:
+    """Settle folders for listing items in listing order, before they are resolved on several threads."""
+    for child in children:
+        post = child.get('data') if isinstance(child, dict) else None
+        if isinstance(post, dict) and post.get('name'):
+            _assign_post_folder(layout, post['name'], clean_filename(post.get('title') or post['name']))
+
+
+def create_layout_dirs(output_dir: str, entries: list[dict]) -> None:
+    """Create the folders of every post that has media in one pass, ahead of the downloads."""
+    for entry in entries:
+        if entry["media"]:
+            _ensure_dir(os.path.join(output_dir, entry["folder"]))
+
+
+def _download_post(entry: dict, output_dir: str, log_callback, pause_event=None, stop_event=None, media_check=None, session=None,
+                   job=None, transcode=None) -> str:
+    """Download every file of one plan entry.
+
+    Returns "done", "failed" if any file could not be downloaded, or "stopped" if a stop was requested.
+    """
+    post_title = entry["title"]
+    post_folder = os.path.join(output_dir, entry["folder"])
+    media = entry["media"]
+    if not media:
+        log_callback(f"[{post_title}] No media found.")
+        return "done"
+
+    log_callback(f"[{post_title}] Found {len(media)} media file(s).")
+    downloaded_any = False
+    failed = False
+
+    for media_idx, item in enumerate(media, 1):
+        # Check for stop before each download
+        if stop_event and stop_event.is_set():
+            return "stopped"
+
+        # Wait if paused
+        if not _wait_if_paused(pause_event, stop_event):
+            return "stopped"
+
+        media_url = item.get("resolved_url") or item["url"]
+        log_callback(f"→ {media_url}")
+
+        # Add numbering for gallery images to maintain order
+        filename_prefix = f"{media_idx:02d}" if entry["is_gallery"] and len(media) > 1 else ""
+
+        def saved(path, item=item):
+            log_callback(f"  ✓ Saved to: {path}")
+            try:
+                item["size"] = os.path.getsize(path)
+            except OSError:
+                pass
+            submit_transcode(transcode, path, media_check)
+
+        if item.get("dash_url"):
+            filename = item.get("filename") or _media_target_filename(media_url, filename_prefix)
+            if download_reddit_video(item["dash_url"], post_folder, filename, log_callback, saved,
+                                     pause_event, stop_event, session, job):
+                downloaded_any = True
+                continue
+            if stop_event and stop_event.is_set():
+                return "stopped"
+
+        result = download_file(media_url, post_folder, filename_prefix, pause_event, stop_event, session, job,
+                               item.get("filename"))
+        if result:
+            downloaded_any = True
+            saved(result)
+        elif stop_event and stop_event.is_set():
+            return "stopped"
+        else:
+            failed = True
+            log_callback(f"  ✗ Failed to download: {media_url}")
+    if not downloaded_any:
+        # rmdir only succeeds on an empty folder, so no listing is needed first
+        try:
+            os.rmdir(post_folder)
+            with _known_dirs_lock:
+                _known_dirs.discard(post_folder)
+        except OSError:
+            pass
+    return "failed" if failed else "done"
+
+
+# Size-aware scheduling: which resolved post to download next
+SCHEDULE_POLICIES = ("interleave", "smallest", "newest", "listing")
+# Rough sizes by media kind, used until a HEAD or a finished download gives a real number
+_KIND_SIZE_ESTIMATES = {
+    "image": 1024 ** 2,
+    "gallery_image": 1024 ** 2,
+    "gif": 4 * 1024 ** 2,
+    "video": 25 * 1024 ** 2,
+    "reddit_video": 30 * 1024 ** 2,
+    "redgifs": 15 * 1024 ** 2,
+}
+# Kinds whose size varies too much for an estimate; these get a HEAD before scheduling
+_PROBED_KINDS = ("video", "reddit_video", "redgifs", "gif")
+# Posts expected to be at least this big count as large under the interleave policy
+LARGE_POST_BYTES = 50 * 1024 ** 2
+# Resolved posts kept waiting per worker, so the scheduler has something to choose from
+_SCHEDULE_LOOKAHEAD = 4
+
+
+def expected_post_bytes(entry: dict, observed: dict | None = None) -> int:
+    """Best guess at a post's download size: known sizes first, then Reddit's own estimate, then per-kind averages."""
+    total = 0
+    for item in entry["media"]:
+        size = item.get("size") or item.get("estimate")
+        if not size:
+            kind = item.get("kind") or _media_kind(item.get("resolved_url") or item["url"], entry["is_gallery"])
+            count, nbytes = (observed or {}).get(kind, (0, 0))
+            size = nbytes // count if count else _KIND_SIZE_ESTIMATES.get(kind, _KIND_SIZE_ESTIMATES["image"])
+        total += size
+    return total
+
+
+def _observe_post_sizes(observed: dict, entry: dict) -> None:
+    # Running totals per kind, so estimates follow what this listing actually contains
+    for item in entry["media"]:
+        if item.get("size") and item.get("kind"):
+            count, nbytes = observed.get(item["kind"], (0, 0))
+            observed[item["kind"]] = (count + 1, nbytes + item["size"])
+
+
+def _probe_entry_sizes(entry: dict, executor) -> None:
+    """HEAD the media whose size can't be guessed from its kind; also settles which preview variant works."""
+    items = [item for item in entry["media"]
+             if not item.get("size") and item.get("kind") in _PROBED_KINDS and not item.get("estimate")]
+    for item, (resolved_url, size) in zip(items, executor.map(lambda item: probe_media_size(item["url"]), items)):
+        if resolved_url:
+            item["resolved_url"] = resolved_url
+        if size:
+            item["size"] = size
+
+
+def _pick_scheduled_post(ready: list, policy: str, observed: dict, large_open: bool, force: bool):
+    """Choose the next candidate from ready. Returns (candidate, is_large) or None to wait for more."""
+    if not ready:
+        return None
+    if policy == "listing":
+        return min(ready, key=lambda c: c["seq"]), False
+    if policy == "newest":
+        return min(ready, key=lambda c: (-c["entry"].get("created", 0), c["seq"])), False
+    sized = [(expected_post_bytes(c["entry"], observed), c) for c in ready]
+    if policy == "smallest":
+        return min(sized, key=lambda bc: (bc[0], bc[1]["seq"]))[1], False
+    # interleave: keep a few large transfers running in the background while the other workers
+    # work through small posts in listing order
+    small = [c for nbytes, c in sized if nbytes < LARGE_POST_BYTES]
+    large = [c for nbytes, c in sized if nbytes >= LARGE_POST_BYTES]
+    if large and large_open:
+        return min(large, key=lambda c: c["seq"]), True
+    if small:
+        return min(small, key=lambda c: c["seq"]), False
+    if large and force:
+        return min(large, key=lambda c: c["seq"]), True
+    return None
+
+
+def download_posts_scheduled(posts, resolve, output_dir, log_callback, pause_event=None, stop_event=None,
+                             media_check=None, workers=4, policy="interleave", transcode=None) -> bool:
+    """Download posts on a pool of workers, picking the next post by policy. Returns False if stopped.
+
+    resolve(idx, post) turns a listing item into a plan entry (or None to skip it). It runs on one
+    thread that stays a few posts per worker ahead of the downloads, so policies choose among the
+    posts resolved so far; with a saved plan every post is known up front. A post is the unit of
+    scheduling, so all files of a gallery download together on one worker.
+    """
+    stop_event = stop_event or Event()
+    workers = max(1, workers)
+    large_slots = max(1, workers // 3)
+    media_session = _new_media_session(workers)
+    probe_executor = ThreadPoolExecutor(max_workers=4)
+    cond = Condition()
+    state = {"ready": [], "resolving": True, "large_active": 0}
+    observed: dict = {}
+    lookahead = _SCHEDULE_LOOKAHEAD * workers
+
+    def resolver():
+        try:
+            for idx, post in enumerate(posts, start=1):
+                with cond:
+                    while len(state["ready"]) >= lookahead and not stop_event.is_set():
+                        # Timed: a stop sets an Event, which doesn't notify this condition
+                        cond.wait(0.5)
+                if not _wait_if_paused(pause_event, stop_event):
+                    return
+                try:
+                    entry = resolve(idx, post)
+                    if entry is not None and policy != "listing":
+                        _probe_entry_sizes(entry, probe_executor)
+                except Exception as e:
+                    log_callback(f"✗ Error: {e}")
+                    continue
+                if entry is None:
+                    continue
+                with cond:
+                    state["ready"].append({"seq": idx, "entry": entry})
+                    cond.notify_all()
+        finally:
+            with cond:
+                state["resolving"] = False
+                cond.notify_all()
+
+    def worker():
+        while True:
+            if not _wait_if_paused(pause_event, stop_event):
+                return
+            with cond:
+                while True:
+                    if stop_event.is_set():
+                        return
+                    force = not state["resolving"] or len(state["ready"]) >= lookahead
+                    picked = _pick_scheduled_post(state["ready"], policy, observed,
+                                                  state["large_active"] < large_slots, force)
+                    if picked is not None:
+                        break
+                    if not state["resolving"] and not state["ready"]:
+                        return
+                    cond.wait(0.5)
+                candidate, is_large = picked
+                state["ready"].remove(candidate)
+                if is_large:
+                    state["large_active"] += 1
+                cond.notify_all()
+            entry = candidate["entry"]
+            # Resolving runs ahead of the workers, so this line (not "Processing post:") marks real progress
+            log_callback(f"Downloading post: '{entry['title']}'")
+            try:
+                _download_post(entry, output_dir, log_callback, pause_event, stop_event, media_check, media_session,
+                               transcode=transcode)
+            except Exception as e:
+                log_callback(f"✗ Error: {e}")
+            finally:
+                with cond:
+                    _observe_post_sizes(observed, entry)
+                    if is_large:
+                        state["large_active"] -= 1
+                    cond.notify_all()
+
+    threads = [Thread(target=resolver, daemon=True)] + [Thread(target=worker, daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    try:
+        alive = threads
+        while alive:
+            # Short joins keep the calling thread responsive to Ctrl+C
+            alive[0].join(timeout=1.0)
+            alive = [t for t in alive if t.is_alive()]
+    finally:
+        probe_executor.shutdown(wait=False, cancel_futures=True)
+    return not stop_event.is_set()
+
+
+def scrape_reddit_saved(url, cookies_str, output_dir, log_callback, pause_event=None, stop_event=None, check_media=False, plan_path=None,
+                        workers=4, policy="interleave", transcode=None):
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) RedditSavedDownloader/1.0'}
+    cookies = parse_cookie_string_to_dict(cookies_str or "")
+    cookies.setdefault('over18', '1')
+
+    if plan_path:
+        # Listing and media resolution were done by an earlier --plan run
+        try:
+            plan = load_download_plan(plan_path)
+        except (OSError, ValueError) as e:
+            log_callback(f"Could not load plan {plan_path}: {e}")
+            return
+        items = plan["posts"]
+        log_callback(f"Loaded plan {plan_path} ({plan.get('source', 'unknown source')}).")
+        log_callback(f"Found {len(items)} saved items. Downloading from plan...")
+    else:
+        try:
+            saved_url = normalize_saved_url_to_old_reddit(url)
+        except Exception as e:
+            log_callback(f"Invalid URL: {e}")
+            return
+
+        log_callback(f"Using endpoint: {saved_url}")
+        items = fetch_all_saved_items_json(saved_url, headers, cookies, log_callback, stop_event)
+        if stop_event and stop_event.is_set():
+            log_callback("⏹ Stopped downloading.")
+            return
+        if not items:
+            log_callback("No saved items found. If this seems wrong, re-copy your Cookie header from a logged-in tab on old.reddit.com.")
+            return
+
+        log_callback(f"Found {len(items)} saved items. Extracting media and downloading...")
+
+    layout = load_output_layout(output_dir)
+    if plan_path:
+        # Every path is known up front: settle the whole layout and create its folders in one pass
+        for entry in items:
+            assign_post_layout(layout, entry)
+        save_output_layout(layout)
+        create_layout_dirs(output_dir, items)
+
+    def resolve(idx, child):
+        if plan_path:
+            log_callback(f"Processing post: '{child['title']}' -> {os.path.join(output_dir, child['folder'])}")
+            return child
+        if not isinstance(child, dict) or 'data' not in child:
+            return None
+        entry = _plan_post(child['data'], idx, output_dir, headers, cookies, log_callback, layout=layout)
+        # Created here, on the resolver thread, so download workers never touch directories
+        create_layout_dirs(output_dir, [entry])
+        return entry
+
+    if policy not in SCHEDULE_POLICIES:
+        log_callback(f"Unknown download order '{policy}', using interleave.")
+        policy = "interleave"
+    media_check = start_media_check(output_dir, log_callback) if check_media else None
+    transcode_stage = start_transcode(output_dir, log_callback, policy=transcode) if transcode else None
+    try:
+        if not download_posts_scheduled(items, resolve, output_dir, log_callback, pause_event, stop_event,
+                                        media_check, workers, policy, transcode_stage):
+            log_callback("⏹ Stopped downloading.")
+            return
+    finally:
+        save_output_layout(layout)
+        wait_for_muxing()
+        finish_transcode(transcode_stage, log_callback, media_check)
+        finish_media_check(media_check, log_callback)
+
+    if not (stop_event and stop_event.is_set()):
+        log_callback("✅ Done downloading saved posts!")
+
+
+# Dry-run planning: size estimation and disk-space check
+PLAN_VERSION = 1
+
+
+def _format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.2f} TB"
+
+
+def probe_media_size(url: str, timeout=(10, 30)) -> tuple[str | None, int | None]:
+    """Find the first URL variant that answers and its Content-Length. Returns (url, size); size is None if unknown."""
+    import requests
+
+    for attempt_url in _try_convert_reddit_preview_url(url):
+        headers = _media_request_headers(attempt_url)
+        try:
+            r = requests.head(attempt_url, headers=headers, timeout=timeout, allow_redirects=True)
+            if r.status_code in (405, 501) or (r.ok and 'Content-Length' not in r.headers):
+                # HEAD not supported or no length given: ask for a single byte and read the total from Content-Range
+                headers['Range'] = 'bytes=0-0'
+                with requests.get(attempt_url, headers=headers, timeout=timeout, stream=True) as r:
+                    if r.status_code == 206:
+                        total = r.headers.get('Content-Range', '').rpartition('/')[2]
+                        return attempt_url, int(total) if total.isdigit() else None
+                    if r.ok:
+                        length = r.headers.get('Content-Length')
+                        return attempt_url, int(length) if length and length.isdigit() else None
+                    continue
+            if r.ok:
+                return attempt_url, int(r.headers['Content-Length'])
+        except Exception:
+            continue
+    return None, None
+
+
+def build_download_plan(url, cookies_str, output_dir, log_callback, stop_event=None, workers=8) -> dict | None:
+    """List the saved posts, resolve their media and HEAD every file concurrently. Nothing is downloaded."""
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) RedditSavedDownloader/1.0'}
+    cookies = parse_cookie_string_to_dict(cookies_str)
+    cookies.setdefault('over18', '1')
+
+    try:
+        saved_url = normalize_saved_url_to_old_reddit(url)
+    except Exception as e:
+        log_callback(f"Invalid URL: {e}")
+        return None
+
+    log_callback(f"Using endpoint: {saved_url}")
+    items = fetch_all_saved_items_json(saved_url, headers, cookies, log_callback, stop_event)
+    if not items:
+        log_callback("No saved items found. If this seems wrong, re-copy your Cookie header from a logged-in tab on old.reddit.com.")
+        return None
+
+    log_callback(f"Found {len(items)} saved items. Resolving media...")
+    # Read-only: a dry run doesn't record folder assignments, but it sees the ones earlier runs made
+    layout = load_output_layout(output_dir, readonly=True)
+    posts = []
+    for idx, child in enumerate(items, start=1):
+        if stop_event and stop_event.is_set():
+            return None
+        if not isinstance(child, dict) or 'data' not in child:
+            continue
+        posts.append(_plan_post(child['data'], idx, output_dir, headers, cookies, log_callback, layout=layout))
+
+    media = [item for entry in posts for item in entry["media"]]
+    log_callback(f"Checking sizes of {len(media)} media file(s)...")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(probe_media_size, item["url"]): item for item in media}
+        for done, future in enumerate(as_completed(futures), 1):
+            item = futures[future]
+            item["resolved_url"], item["size"] = future.result()
+            if done % 50 == 0:
+                log_callback(f"  {done}/{len(media)} checked")
+            if stop_event and stop_event.is_set():
+                executor.shutdown(cancel_futures=True)
+                return None
+
+    return {
+        "version": PLAN_VERSION,
+        "created": time.time(),
+        "source": saved_url,
+        "posts": posts,
+    }
+
+
+def summarize_download_plan(plan: dict, output_dir: str, log_callback) -> bool:
+    """Log totals per host and compare them with free space. Returns False if the download won't fit."""
+    hosts: dict[str, list[int]] = {}
+    total = 0
+    unknown = 0
+    unreachable = 0
+    already_present = 0
+    for entry in plan["posts"]:
+        gallery = entry["is_gallery"] and len(entry["media"]) > 1
+        for media_idx, item in enumerate(entry["media"], 1):
+            if not item.get("resolved_url"):
+                unreachable += 1
+                continue
+            host = urlparse(item["resolved_url"]).netloc or "unknown"
+            stats = hosts.setdefault(host, [0, 0])
+            stats[0] += 1
+            size = item.get("size")
+            if size is None:
+                unknown += 1
+                continue
+            stats[1] += size
+            total += size
+            # Files already on disk at the same size are overwritten in place and need no new space
+            target = os.path.join(output_dir, entry["folder"], item.get("filename") or
+                                  _media_target_filename(item["resolved_url"], f"{media_idx:02d}" if gallery else ""))
+            try:
+                if os.path.getsize(target) == size:
+                    already_present += size
+            except OSError:
+                pass
+
+    file_count = sum(stats[0] for stats in hosts.values())
+    log_callback(f"Plan: {len(plan['posts'])} posts, {file_count} files, {_format_bytes(total)}"
+                 + (f" ({unknown} file(s) of unknown size)" if unknown else ""))
+    for host, (count, size) in sorted(hosts.items(), key=lambda kv: kv[1][1], reverse=True):
+        log_callback(f"  {host:<28} {count:>6} files  {_format_bytes(size):>10}")
+    if unreachable:
+        log_callback(f"  {unreachable} file(s) did not answer and will likely fail")
+
+    # Walk up to the nearest existing folder; the output folder may not exist yet
+    probe_dir = os.path.abspath(output_dir)
+    while not os.path.isdir(probe_dir) and os.path.dirname(probe_dir) != probe_dir:
+        probe_dir = os.path.dirname(probe_dir)
+    free = shutil.disk_usage(probe_dir).free
+    needed = total - already_present
+    log_callback(f"Needs {_format_bytes(needed)}, free on {probe_dir}: {_format_bytes(free)}")
+    if needed > free:
+        log_callback(f"⚠ Not enough disk space: short by {_format_bytes(needed - free)}.")
+        return False
+    return True
+
+
+def save_download_plan(plan: dict, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, ensure_ascii=False, indent=1)
+
+
+def load_download_plan(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        plan = json.load(f)
+    if not isinstance(plan, dict) or plan.get("version") != PLAN_VERSION or not isinstance(plan.get("posts"), list):
+        raise ValueError("not a download plan, or one written by an incompatible version")
+    return plan
+
+
+# Sync daemon: poll the head of the saved listing and download only new saves
+SYNC_STATE_FILENAME = ".sync_state.json"
+_SYNC_SEEN_LIMIT = 2000
+_SYNC_HEAD_LIMIT = 25
+_SYNC_MAX_PAGES = 20
+# A save whose media keeps failing is retried on this many polls, then marked seen anyway
+_SYNC_MAX_ATTEMPTS = 5
+
+
+def _new_session(headers: dict | None = None, cookies: dict | None = None):
+    import requests
+
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    # Scope the login cookies to reddit so they never go out with media requests to other hosts
+    for key, value in (cookies or {}).items():
+        session.cookies.set(key, value, domain='.reddit.com')
+    return session
+
+
+def load_sync_state(output_dir: str) -> dict | None:
+    try:
+        with open(os.path.join(output_dir, SYNC_STATE_FILENAME), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if isinstance(state, dict) and isinstance(state.get('seen'), list):
+            return state
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def save_sync_state(output_dir: str, state: dict) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, SYNC_STATE_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _poll_saved_head(session, saved_url: str, state: dict, log_callback) -> tuple[list[dict], dict] | None:
+    """Fetch the newest saves not seen before, newest first. Returns None on errors that should stop the daemon.
+
+    Also returns the head page's validators; the caller stores them in state only once every
+    new save has been handled, or the next poll's 304 would hide the ones that weren't.
+    """
+    json_url = saved_url.rstrip('/') + '/.json'
+    seen = set(state['seen'])
+    new_items: list[dict] = []
+    validators: dict = {}
+    after = None
+    for page in range(_SYNC_MAX_PAGES):
+        params = {'limit': str(_SYNC_HEAD_LIMIT), 'raw_json': '1'}
+        headers = {}
+        if after:
+            params['after'] = after
+        else:
+            # Only the head request is conditional; it's the one repeated every interval
+            if state.get('etag'):
+                headers['If-None-Match'] = state['etag']
+            if state.get('last_modified'):
+                headers['If-Modified-Since'] = state['last_modified']
+        resp = session.get(json_url, params=params, headers=headers, timeout=30)
+        if resp.status_code == 304:
+            return [], {}
+        if resp.status_code in (401, 403):
+            log_callback("Authentication failed. Make sure your cookie header is from a logged-in session.")
+            return None
+        resp.raise_for_status()
+        if not after:
+            validators = {'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+
+        data = resp.json()
+        children = data['data']['children']
+        for child in children:
+            if child.get('data', {}).get('name') in seen:
+                return new_items, validators
+            new_items.append(child)
+        after = data['data'].get('after')
+        # Nothing seen yet (first run): the head page is all we need
+        if not seen or not children or not after:
+            break
+    return new_items, validators
+
+
+def run_sync_daemon(url, cookies_str, output_dir, log_callback, interval=300, pause_event=None, stop_event=None, check_media=False,
+                    transcode=None):
+    """Keep polling the saved listing and archive new saves as they show up, until stop_event is set."""
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) RedditSavedDownloader/1.0'}
+    cookies = parse_cookie_string_to_dict(cookies_str)
+    cookies.setdefault('over18', '1')
+    try:
+        saved_url = normalize_saved_url_to_old_reddit(url)
+    except Exception as e:
+        log_callback(f"Invalid URL: {e}")
+        return
+
+    # One session for the whole run keeps connections (and TLS) to reddit and the CDNs alive between polls
+    session = _new_session(headers, cookies)
+    layout = load_output_layout(output_dir)
+    state = load_sync_state(output_dir)
+    seeding = state is None
+    if seeding:
+        state = {'seen': []}
+    log_callback(f"Watching {saved_url} every {interval}s. Press Ctrl+C to stop.")
+
+    delay = interval
+    while not (stop_event and stop_event.is_set()):
+        if not _wait_if_paused(pause_event, stop_event):
+            break
+        try:
+            polled = _poll_saved_head(session, saved_url, state, log_callback)
+            delay = interval
+        except Exception as e:
+            retry_after = getattr(getattr(e, 'response', None), 'headers', {}).get('Retry-After', '')
+            delay = int(retry_after) if retry_after.isdigit() else min(max(delay, interval) * 2, 3600)
+            log_callback(f"Poll failed ({e}); retrying in {delay}s.")
+            polled = [], {}
+        if polled is None:
+            break
+        new_items, validators = polled
+
+        names = [child.get('data', {}).get('name') for child in new_items]
+        # Saves that failed on earlier polls sit behind newer seen ones, so the head scan won't return them
+        retry = state.setdefault('retry', {})
+        batch = [{'data': record['data']} for name, record in retry.items() if name not in names]
+        batch += reversed(new_items)
+        if seeding:
+            log_callback(f"First run: marked the {len(names)} newest save(s) as already seen. "
+                         "Run a normal download once to archive everything saved before now.")
+            seeding = False
+        elif batch:
+            if new_items:
+                log_callback(f"{len(new_items)} new save(s).")
+            if len(batch) > len(new_items):
+                log_callback(f"Retrying {len(batch) - len(new_items)} save(s) that failed before.")
+            media_check = start_media_check(output_dir, log_callback) if check_media else None
+            transcode_stage = start_transcode(output_dir, log_callback, policy=transcode) if transcode else None
+            try:
+                # Oldest first, so a stop leaves the seen list without gaps
+                for idx, child in enumerate(batch, start=1):
+                    name = child['data'].get('name')
+                    try:
+                        entry = _plan_post(child['data'], idx, output_dir, headers, cookies, log_callback, session,
+                                           layout)
+                        status = _download_post(entry, output_dir, log_callback, pause_event, stop_event, media_check,
+                                                session, transcode=transcode_stage)
+                    except Exception as e:
+                        log_callback(f"✗ Error: {e}")
+                        status = "failed"
+                    if status == "stopped":
+                        # Keep the old validators so the next poll sees the saves left undone
+                        validators = {}
+                        break
+                    if status == "failed":
+                        attempts = retry.get(name, {}).get('attempts', 0) + 1
+                        if attempts < _SYNC_MAX_ATTEMPTS:
+                            retry[name] = {'data': child['data'], 'attempts': attempts}
+                            log_callback(f"Will retry '{child['data'].get('title', name)}' on the next poll.")
+                            continue
+                        log_callback(f"Giving up on '{child['data'].get('title', name)}' after {attempts} attempts.")
+                    retry.pop(name, None)
+                    state['seen'].insert(0, name)
+            finally:
+                save_output_layout(layout)
+                wait_for_muxing()
+                finish_transcode(transcode_stage, log_callback, media_check)
+                finish_media_check(media_check, log_callback)
+            names = []
+        state.update(validators)
+        state['seen'] = (names + state['seen'])[:_SYNC_SEEN_LIMIT]
+        try:
+            save_sync_state(output_dir, state)
+        except OSError as e:
+            log_callback(f"Failed to save sync state: {e}")
+
+        if stop_event is not None:
+            stop_event.wait(delay)
+        else:
+            time.sleep(delay)
+
+    log_callback("⏹ Sync stopped.")
+
+
+# Job scheduler: several listings/accounts in one process, sharing one download pool
+def _new_media_session(workers: int):
+    import requests
+
+    # No cookies: media CDNs don't need them. The pool is sized so every worker can keep its connection alive.
+    session = _new_session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=max(workers, 10))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _job_status(job: dict) -> dict:
+    return {key: job[key] for key in ("id", "label", "output", "state", "posts_listed", "posts_done", "error")}
+
+
+def format_job_status(status: dict) -> str:
+    text = f"{status['label']}: {status['state']} {status['posts_done']}/{status['posts_listed']} posts"
+    if status['error']:
+        text += f" ({status['error']})"
+    return text
+
+
+def run_download_jobs(jobs: list[dict], log_callback, pause_event=None, stop_event=None, workers=4,
+                      progress_callback=None, status_interval=30) -> list[dict]:
+    """Run many (listing URL, cookie, output dir) jobs at once.
+
+    Every job lists its pages on its own thread; posts go into per-job queues that a shared
+    pool of download workers drains round-robin, so one huge listing can't starve the others.
+    Media connections and the per-host limits are shared by all jobs. Returns the final status
+    of each job; progress_callback (if given) gets a job's status whenever it changes.
+    """
+    stop_event = stop_event or Event()
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) RedditSavedDownloader/1.0'}
+    media_session = _new_media_session(workers)
+    cond = Condition()
+    turn = [0]
+
+    states = []
+    for n, job in enumerate(jobs, start=1):
+        cookies = parse_cookie_string_to_dict(job.get("cookie") or "")
+        cookies.setdefault('over18', '1')
+        states.append({
+            "id": n,
+            "label": job.get("label") or f"job {n}",
+            "url": job["url"],
+            "output": job["output"],
+            "cookies": cookies,
+            # Resolution (redgifs API, HTML fallback) goes through a per-job session so login cookies stay per account
+            "session": _new_session(headers, cookies),
+            "layout": load_output_layout(job["output"]),
+            "queue": deque(),
+            "listing_done": False,
+            "active": 0,
+            "state": "queued",
+            "posts_listed": 0,
+            "posts_started": 0,
+            "posts_done": 0,
+            "error": None,
+        })
+        set_bandwidth_limit(job.get("max_rate") or 0, job=n)
+
+    def job_log(job):
+        return lambda msg: log_callback(f"[{job['label']}] {msg}")
+
+    def report(job):
+        if progress_callback is not None:
+            progress_callback(_job_status(job))
+
+    def finish_if_drained(job):
+        # Caller holds cond
+        if job["listing_done"] and not job["queue"] and job["active"] == 0 and job["state"] not in ("failed", "stopped"):
+            job["state"] = "done"
+            report(job)
+
+    def list_job(job):
+        log = job_log(job)
+        with cond:
+            job["state"] = "listing"
+        report(job)
+        try:
+            saved_url = normalize_saved_url_to_old_reddit(job["url"])
+        except Exception as e:
+            saved_url = None
+            job["error"] = f"Invalid URL: {e}"
+            log(job["error"])
+
+        def add_page(children):
+            # Posts are resolved on whichever worker picks them up, so folders are settled here in listing order
+            reserve_post_folders(job["layout"], children)
+            with cond:
+                job["queue"].extend(children)
+                job["posts_listed"] += len(children)
+                job["state"] = "running"
+                cond.notify_all()
+            report(job)
+
+        items = []
+        if saved_url:
+            items = fetch_all_saved_items_json(saved_url, headers, job["cookies"], log, stop_event, add_page)
+        with cond:
+            job["listing_done"] = True
+            if not items and not stop_event.is_set():
+                job["state"] = "failed"
+                job["error"] = job["error"] or "no saved items found"
+            finish_if_drained(job)
+            cond.notify_all()
+        report(job)
+
+    def next_work():
+        # Caller holds cond. Round-robin over jobs that have posts waiting.
+        for offset in range(len(states)):
+            job = states[(turn[0] + offset) % len(states)]
+            if job["queue"]:
+                turn[0] = (turn[0] + offset + 1) % len(states)
+                job["active"] += 1
+                job["posts_started"] += 1
+                return job, job["queue"].popleft(), job["posts_started"]
+        return None
+
+    def worker():
+        while True:
+            if not _wait_if_paused(pause_event, stop_event):
+                return
+            with cond:
+                work = next_work()
+                while work is None:
+                    if stop_event.is_set() or all(job["listing_done"] and not job["queue"] for job in states):
+                        return
+                    cond.wait()
+                    work = next_work()
+            job, child, idx = work
+            log = job_log(job)
+            try:
+                if isinstance(child, dict) and 'data' in child:
+                    entry = _plan_post(child['data'], idx, job["output"], headers, job["cookies"], log, job["session"],
+                                       job["layout"])
+                    _download_post(entry, job["output"], log, pause_event, stop_event, session=media_session, job=job["id"])
+            except Exception as e:
+                log(f"✗ Error: {e}")
+            finally:
+                with cond:
+                    job["active"] -= 1
+                    job["posts_done"] += 1
+                    finish_if_drained(job)
+                    cond.notify_all()
+            report(job)
+
+    log_callback(f"Starting {len(states)} job(s) with {workers} download worker(s).")
+    threads = [Thread(target=list_job, args=(job,), daemon=True) for job in states]
+    threads += [Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for t in threads:
+        t.start()
+
+    last_status = time.monotonic()
+    alive = threads
+    while alive:
+        # Short joins keep the main thread responsive to Ctrl+C
+        alive[0].join(timeout=1.0)
+        alive = [t for t in alive if t.is_alive()]
+        if progress_callback is None and time.monotonic() - last_status >= status_interval:
+            last_status = time.monotonic()
+            with cond:
+                log_callback("Jobs: " + " | ".join(format_job_status(_job_status(job)) for job in states))
+
+    wait_for_muxing()
+    for job in states:
+        set_bandwidth_limit(0, job=job["id"])
+        save_output_layout(job["layout"])
+        if stop_event.is_set() and job["state"] not in ("done", "failed"):
+            job["state"] = "stopped"
+    statuses = [_job_status(job) for job in states]
+    for status in statuses:
+        log_callback(format_job_status(status))
+    if not stop_event.is_set():
+        log_callback("✅ Done downloading all jobs!")
+    return statuses
+
+
+def load_jobs_file(path: str, default_output: str) -> list[dict]:
+    """Read a JSON list of jobs: {"url": ..., "cookie" or "cookie_file": ..., "output": ..., "label": ..., "max_rate": ...}."""
+    with open(path, 'r', encoding='utf-8') as f:
+        raw_jobs = json.load(f)
+    if not isinstance(raw_jobs, list):
+        raise ValueError("the jobs file must contain a JSON list")
+    jobs = []
+    for n, raw in enumerate(raw_jobs, start=1):
+        if not isinstance(raw, dict) or not raw.get("url"):
+            raise ValueError(f"job {n} has no url")
+        cookie = raw.get("cookie") or ""
+        if raw.get("cookie_file"):
+            with open(raw["cookie_file"], 'r', encoding='utf-8') as f:
+                cookie = f.read().strip()
+        jobs.append({
+            "url": raw["url"],
+            "cookie": cookie,
+            "output": raw.get("output") or os.path.join(default_output, f"job_{n}"),
+            "label": raw.get("label"),
+            "max_rate": parse_rate(raw.get("max_rate")),
+        })
+    return jobs
+
+
+# Distributed work queue: list once, download from many processes or machines
+_QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    entry TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (state, lease_until);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+# A lease not renewed for this long is considered abandoned (worker crashed or lost its network)
+QUEUE_LEASE_SECONDS = 300
+# Posts claimed this many times without completing are marked failed instead of being retried forever
+_QUEUE_MAX_ATTEMPTS = 5
+_QUEUE_METHODS = ("add", "set_listing_done", "claim", "renew", "complete", "release", "stats")
+
+
+class SqliteWorkQueue:
+    """Queue of plan entries in an SQLite file; safe to share between processes on one machine.
+
+    Workers claim one post at a time under a lease and keep it alive with renew(). A post whose
+    lease runs out goes back to whoever claims next, so a crashed worker's posts aren't lost.
+    """
+
+    def __init__(self, path: str):
+        import sqlite3
+
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_QUEUE_SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes can't claim the same row
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def add(self, entries: list[dict]) -> int:
+        """Queue plan entries; posts already in the queue (done or not) are skipped. Returns how many were new."""
+        rows = [(entry.get("name") or entry["folder"], json.dumps(entry, ensure_ascii=False)) for entry in entries]
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO items (name, entry) VALUES (?, ?)", rows)
+            return db.total_changes - before
+
+    def set_listing_done(self, done: bool) -> None:
+        with self._transaction() as db:
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('listing_done', ?)", ("1" if done else "0",))
+
+    def claim(self, worker: str, lease: float = QUEUE_LEASE_SECONDS):
+        """Lease the oldest available post to worker. Returns (name, entry) or None if nothing is available."""
+        now = time.time()
+        with self._transaction() as db:
+            while True:
+                row = db.execute(
+                    "SELECT name, entry, attempts FROM items"
+                    " WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) ORDER BY id LIMIT 1",
+                    (now,)).fetchone()
+                if row is None:
+                    return None
+                name, entry, attempts = row
+                if attempts >= _QUEUE_MAX_ATTEMPTS:
+                    db.execute("UPDATE items SET state = 'failed', error = coalesce(error, 'lease expired too often')"
+                               " WHERE name = ?", (name,))
+                    continue
+                db.execute("UPDATE items SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1"
+                           " WHERE name = ?", (worker, now + lease, name))
+                return name, json.loads(entry)
+
+    def renew(self, worker: str, names: list[str], lease: float = QUEUE_LEASE_SECONDS) -> None:
+        with self._transaction() as db:
+            db.executemany("UPDATE items SET lease_until = ? WHERE name = ? AND worker = ? AND state = 'leased'",
+                           [(time.time() + lease, name, worker) for name in names])
+
+    def complete(self, worker: str, name: str) -> None:
+        with self._transaction() as db:
+            db.execute("UPDATE items SET state = 'done', lease_until = 0, error = NULL"
+                       " WHERE name = ? AND worker = ? AND state = 'leased'", (name, worker))
+
+    def release(self, worker: str, name: str, error: str | None = None) -> None:
+        """Give a post back. Without an error (a stop) it doesn't count as an attempt."""
+        with self._transaction() as db:
+            if error is None:
+                db.execute("UPDATE items SET state = 'pending', lease_until = 0, attempts = max(attempts - 1, 0)"
+                           " WHERE name = ? AND worker = ? AND state = 'leased'", (name, worker))
+            else:
+                db.execute("UPDATE items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                           " lease_until = 0, error = ? WHERE name = ? AND worker = ? AND state = 'leased'",
+                           (_QUEUE_MAX_ATTEMPTS, error, name, worker))
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+            for state, expired, count in self._db.execute(
+                    "SELECT state, state = 'leased' AND lease_until < ?, count(*) FROM items GROUP BY 1, 2", (now,)):
+                counts["pending" if expired else state] += count
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'listing_done'").fetchone()
+        counts["listing_done"] = bool(row and row[0] == "1")
+        return counts
+
+
+class BrokerWorkQueue:
+    """Client for a queue served by serve_work_queue() on another machine; same methods as SqliteWorkQueue."""
+
+    def __init__(self, url: str, token: str | None = None):
+        self._url = url.rstrip('/')
+        self._session = _new_session({"Authorization": f"Bearer {token}"} if token else None)
+
+    def _call(self, method: str, **params):
+        resp = self._session.post(f"{self._url}/{method}", json=params, timeout=60)
+        resp.raise_for_status()
+        return resp.json().get("result")
+
+    def add(self, entries):
+        return self._call("add", entries=entries)
+
+    def set_listing_done(self, done):
+        return self._call("set_listing_done", done=done)
+
+    def claim(self, worker, lease=QUEUE_LEASE_SECONDS):
+        result = self._call("claim", worker=worker, lease=lease)
+        return tuple(result) if result else None
+
+    def renew(self, worker, names, lease=QUEUE_LEASE_SECONDS):
+        return self._call("renew", worker=worker, names=names, lease=lease)
+
+    def complete(self, worker, name):
+        return self._call("complete", worker=worker, name=name)
+
+    def release(self, worker, name, error=None):
+        return self._call("release", worker=worker, name=name, error=error)
+
+    def stats(self):
+        return self._call("stats")
+
+
+def open_work_queue(spec: str, token: str | None = None):
+    """An http(s):// URL opens a broker client; anything else is an SQLite file path."""
+    if spec.startswith(("http://", "https://")):
+        return BrokerWorkQueue(spec, token)
+    return SqliteWorkQueue(spec)
+
+
+def format_queue_stats(stats: dict) -> str:
+    text = (f"Queue: {stats['pending']} pending, {stats['leased']} in progress, "
+            f"{stats['done']} done, {stats['failed']} failed")
+    return text if stats["listing_done"] else text + " (listing still being queued)"
+
+
+def serve_work_queue(db_path: str, address: str, log_callback, token: str | None = None, stop_event=None) -> None:
+    """Serve an SQLite queue over HTTP so workers on other machines can share it. Runs until stop_event is set."""
+    import hmac
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    queue = SqliteWorkQueue(db_path)
+    host, _, port = address.rpartition(":")
+    stop_event = stop_event or Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            method = self.path.strip("/")
+            if token and not hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {token}"):
+                return self._reply(401, {"error": "bad token"})
+            if method not in _QUEUE_METHODS:
+                return self._reply(404, {"error": f"unknown method {method}"})
+            try:
+                params = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                self._reply(200, {"result": getattr(queue, method)(**params)})
+            except Exception as e:
+                self._reply(400, {"error": str(e)})
+
+        def _reply(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    log_callback(f"Serving queue {db_path} on http://{host or '127.0.0.1'}:{port}. Press Ctrl+C to stop.")
+    last = None
+    try:
+        while not stop_event.wait(30):
+            text = format_queue_stats(queue.stats())
+            if text != last:
+                log_callback(text)
+                last = text
+    finally:
+        server.shutdown()
+
+
+def enqueue_saved_posts(url, cookies_str, queue, output_dir, log_callback, stop_event=None, plan_path=None,
+                        resolvers=8) -> int | None:
+    """Fetch the listing once, resolve every post and queue it for workers. Returns how many posts were new."""
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) RedditSavedDownloader/1.0'}
+    cookies = parse_cookie_string_to_dict(cookies_str or "")
+    cookies.setdefault('over18', '1')
+
+    if plan_path:
+        try:
+            posts = load_download_plan(plan_path)["posts"]
+        except (OSError, ValueError) as e:
+            log_callback(f"Could not load plan {plan_path}: {e}")
+            return None
+        items = None
+    else:
+        try:
+            saved_url = normalize_saved_url_to_old_reddit(url)
+        except Exception as e:
+            log_callback(f"Invalid URL: {e}")
+            return None
+        items = [child for child in fetch_all_saved_items_json(saved_url, headers, cookies, log_callback, stop_event)
+                 if isinstance(child, dict) and 'data' in child]
+        if not items:
+            log_callback("No saved items found. If this seems wrong, re-copy your Cookie header from a logged-in tab on old.reddit.com.")
+            return None
+        log_callback(f"Found {len(items)} saved items. Resolving media and queueing...")
+
+    # Folder names are settled here, once, so every worker writes a post to the same place
+    layout = load_output_layout(output_dir)
+    queue.set_listing_done(False)
+    added = 0
+    batch_size = 100
+    with ThreadPoolExecutor(max_workers=resolvers) as executor:
+        total = len(posts) if items is None else len(items)
+        for start in range(0, total, batch_size):
+            if stop_event and stop_event.is_set():
+                log_callback("⏹ Stopped queueing; posts queued so far can still be downloaded.")
+                save_output_layout(layout)
+                return added
+            if items is None:
+                batch = [assign_post_layout(layout, entry) for entry in posts[start:start + batch_size]]
+            else:
+                # Resolution runs concurrently; which post gets a contested name must not depend on timing
+                reserve_post_folders(layout, items[start:start + batch_size])
+                batch = list(executor.map(
+                    lambda n: _plan_post(items[n]['data'], n + 1, output_dir, headers, cookies, log_callback,
+                                         layout=layout),
+                    range(start, min(start + batch_size, total))))
+            # Each batch is committed at once, so workers can start on it while the rest resolves
+            added += queue.add(batch)
+    queue.set_listing_done(True)
+    save_output_layout(layout)
+    log_callback(f"Queued {added} new post(s). {format_queue_stats(queue.stats())}")
+    return added
+
+
+def run_queue_worker(queue, output_dir, log_callback, workers=4, pause_event=None, stop_event=None,
+                     check_media=False, worker_id: str | None = None, poll_interval=10, transcode=None) -> int:
+    """Claim and download posts from a shared queue until it is drained. Returns how many posts this process finished."""
+    stop_event = stop_event or Event()
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    media_session = _new_media_session(workers)
+    held: set = set()
+    held_lock = Lock()
+    finished = [0]
+    drained = Event()
+
+    def heartbeat():
+        # Keep leases alive while long videos download; the thread dies with the process, which is the point
+        while not drained.wait(QUEUE_LEASE_SECONDS / 3):
+            with held_lock:
+                names = list(held)
+            if names:
+                try:
+                    queue.renew(worker_id, names)
+                except Exception as e:
+                    log_callback(f"Could not renew leases: {e}")
+
+    def worker():
+        while _wait_if_paused(pause_event, stop_event):
+            try:
+                claimed = queue.claim(worker_id)
+                if claimed is None:
+                    stats = queue.stats()
+                    if stats["listing_done"] and not stats["pending"] and not stats["leased"]:
+                        return
+                    # Others still hold leases (or the listing is still being queued): they may yet come back
+                    stop_event.wait(poll_interval)
+                    continue
+            except Exception as e:
+                log_callback(f"Queue unavailable ({e}); retrying in {poll_interval}s.")
+                stop_event.wait(poll_interval)
+                continue
+            name, entry = claimed
+            # Entries may come from another machine: never let a folder name leave the output folder
+            entry["folder"] = clean_filename(entry.get("folder") or name)
+            _unique_media_filenames(entry)
+            with held_lock:
+                held.add(name)
+            error = None
+            try:
+                log_callback(f"Processing post: '{entry['title']}' -> {os.path.join(output_dir, entry['folder'])}")
+                status = _download_post(entry, output_dir, log_callback, pause_event, stop_event, media_check,
+                                        media_session, transcode=transcode_stage)
+                if status == "failed":
+                    # Released with an error, so it is retried and counts towards the attempt limit
+                    error = "some media failed to download"
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+                log_callback(f"✗ Error: {error}")
+            with held_lock:
+                held.discard(name)
+            try:
+                if stop_event.is_set():
+                    queue.release(worker_id, name)
+                elif error is not None:
+                    queue.release(worker_id, name, error)
+                else:
+                    queue.complete(worker_id, name)
+                    finished[0] += 1
+            except Exception as e:
+                # The lease will simply expire and the post is downloaded again (resuming any .part files)
+                log_callback(f"Could not report {name} to the queue: {e}")
+
+    log_callback(f"Worker {worker_id} starting with {workers} download thread(s).")
+    media_check = start_media_check(output_dir, log_callback) if check_media else None
+    transcode_stage = start_transcode(output_dir, log_callback, policy=transcode) if transcode else None
+    Thread(target=heartbeat, daemon=True).start()
+    threads = [Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for t in threads:
+        t.start()
+    try:
+        alive = threads
+        while alive:
+            alive[0].join(timeout=1.0)
+            alive = [t for t in alive if t.is_alive()]
+    finally:
+        drained.set()
+        wait_for_muxing()
+        finish_transcode(transcode_stage, log_callback, media_check)
+        finish_media_check(media_check, log_callback)
+    log_callback(f"Worker {worker_id} finished {finished[0]} post(s). {format_queue_stats(queue.stats())}")
+    return finished[0]
+
+
+# Post-download media check: validation + perceptual near-duplicate index
+MEDIA_INDEX_FILENAME = ".media_index.json"
+_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+_VIDEO_EXTENSIONS = ('.mp4', '.webm', '.mov')
+# Max differing bits (out of 64) for two files to count as near-duplicates
+NEAR_DUPLICATE_DISTANCE = 4
+
+
+def _dhash_image(img) -> int:
+    # 64-bit difference hash: survives rescaling and recompression
+    from PIL import Image
+    resample = getattr(Image, "Resampling", None) and Image.Resampling.BILINEAR or Image.BILINEAR
+    pixels = list(img.convert("L").resize((9, 8), resample).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def _read_first_video_frame(path: str):
+    from PIL import Image
+
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return None
+    proc = subprocess.run(
+        [ffmpeg, "-v", "error", "-i", path, "-frames:v", "1", "-f", "image2pipe", "-vcodec", "png", "-"],
+        capture_output=True, timeout=120,
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+    if proc.returncode != 0 or not proc.stdout:
+        raise ValueError(proc.stderr.decode(errors="replace").strip() or "could not decode first frame")
+    return Image.open(io.BytesIO(proc.stdout))
+
+
+def _fingerprint_media_file(path: str) -> dict:
+    """Decode/validate one image (or first video frame) and compute its perceptual hash. Runs in a worker process."""
+    from PIL import Image
+
+    result = {"path": path, "status": "corrupt", "phash": None, "error": None, "size": 0, "mtime": 0}
+    try:
+        st = os.stat(path)
+        result["size"] = st.st_size
+        result["mtime"] = st.st_mtime
+        if st.st_size == 0:
+            result["error"] = "empty file"
+            return result
+        if path.lower().endswith(_VIDEO_EXTENSIONS):
+            img = _read_first_video_frame(path)
+            if img is None:
+                result["status"] = "skipped"
+                result["error"] = "ffmpeg not found, video not checked"
+                return result
+        else:
+            with Image.open(path) as probe:
+                probe.verify()
+            img = Image.open(path)
+            # JPEG only: let the decoder downscale, a hash doesn't need full resolution
+            img.draft("L", (64, 64))
+        with img:
+            img.load()
+            result["phash"] = f"{_dhash_image(img):016x}"
+        result["status"] = "ok"
+    except Exception as e:
+        result["error"] = str(e) or e.__class__.__name__
+    return result
+
+
+def load_media_index(output_dir: str) -> dict:
+    path = os.path.join(output_dir, MEDIA_INDEX_FILENAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if isinstance(index, dict) and isinstance(index.get('files'), dict):
+            return index
+    except (OSError, ValueError):
+        pass
+    return {"version": 1, "files": {}, "duplicates": []}
+
+
+def save_media_index(output_dir: str, index: dict) -> None:
+    path = os.path.join(output_dir, MEDIA_INDEX_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def find_near_duplicates(hashes: dict, max_distance: int = NEAR_DUPLICATE_DISTANCE) -> list[list[str]]:
+    """Group paths whose 64-bit hashes differ in at most max_distance bits."""
+    # Exact matches collapse first so big clusters (e.g. blank frames) don't blow up the pairwise step
+    by_hash: dict[int, list[str]] = {}
+    for path, h in hashes.items():
+        by_hash.setdefault(h, []).append(path)
+    unique = list(by_hash)
+
+    # Pigeonhole: hashes within max_distance bits agree exactly on at least one of
+    # max_distance + 1 bands, so only hashes sharing a band value need comparing.
+    bands = max_distance + 1
+    bounds = [(64 * i // bands, 64 * (i + 1) // bands) for i in range(bands)]
+    buckets: dict[tuple, list[int]] = {}
+    for h in unique:
+        for band, (lo, hi) in enumerate(bounds):
+            buckets.setdefault((band, (h >> lo) & ((1 << (hi - lo)) - 1)), []).append(h)
+
+    parent = {h: h for h in unique}
+
+    def find(h):
+        while parent[h] != h:
+            parent[h] = parent[parent[h]]
+            h = parent[h]
+        return h
+
+    for members in buckets.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if (a ^ b).bit_count() <= max_distance:
+                    root_a, root_b = find(a), find(b)
+                    if root_a != root_b:
+                        parent[root_b] = root_a
+
+    groups: dict[int, list[str]] = {}
+    for h, paths in by_hash.items():
+        groups.setdefault(find(h), []).extend(paths)
+    return sorted(sorted(g) for g in groups.values() if len(g) > 1)
+
+
+def _is_checkable_media(filename: str) -> bool:
+    return filename.lower().endswith(_IMAGE_EXTENSIONS + _VIDEO_EXTENSIONS)
+
+
+def _media_check_workers(workers: int | None) -> int:
+    # ProcessPoolExecutor caps out at 61 workers on Windows
+    return max(1, min(workers or os.cpu_count() or 1, 61))
+
+
+def start_media_check(output_dir: str, log_callback, workers: int | None = None) -> dict | None:
+    """Start the process pool that checks files as they finish downloading."""
+    if not _PIL_AVAILABLE:
+        log_callback("Media check skipped: Pillow is not installed (pip install pillow).")
+        return None
+    return {
+        "output_dir": output_dir,
+        "index": load_media_index(output_dir),
+        "executor": ProcessPoolExecutor(max_workers=_media_check_workers(workers)),
+        "futures": [],
+    }
+
+
+def submit_media_check(stage: dict | None, path: str) -> None:
+    if stage is None or not _is_checkable_media(path):
+        return
+    stage["futures"].append(stage["executor"].submit(_fingerprint_media_file, path))
+
+
+def _record_media_results(stage: dict, results, log_callback) -> None:
+    files = stage["index"]["files"]
+    for result in results:
+        rel = os.path.relpath(result.pop("path"), stage["output_dir"])
+        files[rel] = result
+        if result["status"] == "corrupt":
+            log_callback(f"  ✗ Corrupt media: {rel} ({result['error']})")
+
+
+def finish_media_check(stage: dict | None, log_callback, max_distance: int = NEAR_DUPLICATE_DISTANCE) -> None:
+    """Wait for pending checks, refresh near-duplicate groups and save the index."""
+    if stage is None:
+        return
+    try:
+        _record_media_results(stage, (f.result() for f in as_completed(stage["futures"])), log_callback)
+    finally:
+        stage["executor"].shutdown()
+    stage["futures"] = []
+
+    index = stage["index"]
+    hashes = {rel: int(entry["phash"], 16) for rel, entry in index["files"].items() if entry.get("phash")}
+    index["duplicates"] = find_near_duplicates(hashes, max_distance)
+    try:
+        save_media_index(stage["output_dir"], index)
+    except OSError as e:
+        log_callback(f"Failed to save media index: {e}")
+
+    corrupt = sum(1 for entry in index["files"].values() if entry.get("status") == "corrupt")
+    log_callback(f"Media check: {len(index['files'])} file(s) indexed, {corrupt} corrupt, "
+                 f"{len(index['duplicates'])} near-duplicate group(s).")
+    for group in index["duplicates"]:
+        log_callback("  ≈ " + "  |  ".join(group))
+
+
+def check_media_archive(output_dir: str, log_callback, workers: int | None = None, stop_event=None) -> None:
+    """Validate and hash every media file under output_dir, skipping files unchanged since the last run."""
+    stage = start_media_check(output_dir, log_callback, workers)
+    if stage is None:
+        return
+    files = stage["index"]["files"]
+    seen = set()
+    pending = []
+    for dirpath, _dirnames, filenames in os.walk(output_dir):
+        for name in filenames:
+            if not _is_checkable_media(name):
+                continue
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, output_dir)
+            seen.add(rel)
+            entry = files.get(rel)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if entry and entry.get("size") == st.st_size and entry.get("mtime") == st.st_mtime:
+                continue
+            pending.append(path)
+    # Forget files that were deleted or renamed since the last run
+    for rel in list(files):
+        if rel not in seen:
+            del files[rel]
+
+    log_callback(f"Checking {len(pending)} new or changed media file(s) ({len(seen) - len(pending)} unchanged)...")
+    results = []
+    try:
+        for result in stage["executor"].map(_fingerprint_media_file, pending, chunksize=32):
+            results.append(result)
+            if stop_event and stop_event.is_set():
+                log_callback("⏹ Stopped media check.")
+                stage["executor"].shutdown(cancel_futures=True)
+                break
+    finally:
+        _record_media_results(stage, results, log_callback)
+    finish_media_check(stage, log_callback)
+
+
+# Post-download transcoding: shrink GIFs and PNGs, make MP4s stream-friendly
+TRANSCODE_INDEX_FILENAME = ".transcode_index.json"
+TRANSCODE_POLICIES = ("keep", "replace")
+# Worker processes for transcoding (None = one per CPU); transcodes are CPU-bound, unlike downloads
+_transcode_settings: dict = {"workers": None}
+
+
+def set_transcode_workers(workers: int | None) -> None:
+    _transcode_settings["workers"] = workers
+
+
+def load_transcode_index(output_dir: str) -> dict:
+    try:
+        with open(os.path.join(output_dir, TRANSCODE_INDEX_FILENAME), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if isinstance(index, dict) and isinstance(index.get('files'), dict):
+            return index
+    except (OSError, ValueError):
+        pass
+    return {"version": 1, "files": {}}
+
+
+def save_transcode_index(output_dir: str, index: dict) -> None:
+    path = os.path.join(output_dir, TRANSCODE_INDEX_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _transcode_target(path: str, ext: str) -> str:
+    stem = os.path.splitext(path)[0]
+    # Don't clobber an unrelated file that happens to share the stem
+    return stem + ext if not os.path.exists(stem + ext) else path + ext
+
+
+def _mp4_is_faststart(path: str) -> bool:
+    """True if the moov box comes before mdat, i.e. playback can start before the whole file is read."""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return True
+            size, kind = int.from_bytes(header[:4], 'big'), header[4:]
+            if kind == b'moov':
+                return True
+            if kind == b'mdat':
+                return False
+            header_size = 8
+            if size == 1:
+                size, header_size = int.from_bytes(f.read(8), 'big'), 16
+            elif size == 0:
+                return True
+            if size < header_size:
+                # Malformed box: a seek by size - header_size would go backwards and never end
+                return True
+            f.seek(size - header_size, 1)
+
+
+def _run_ffmpeg(ffmpeg: str, args: list[str]) -> None:
+    proc = subprocess.run([ffmpeg, "-v", "error", "-y"] + args, capture_output=True, timeout=3600,
+                          creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+    if proc.returncode != 0:
+        raise ValueError(proc.stderr.decode(errors="replace").strip()[-300:] or "ffmpeg failed")
+
+
+def _transcode_media_file(path: str, replace: bool, ffmpeg: str | None, fingerprint: bool) -> dict:
+    """Recompress one file. Runs in a worker process; CPU time includes ffmpeg's."""
+    started = os.times()
+    result = {"path": path, "status": "skipped", "output": None, "before": None, "after": None,
+              "cpu": 0.0, "error": None, "checks": []}
+    lower = path.lower()
+    try:
+        size = result["before"] = result["after"] = os.path.getsize(path)
+        if lower.endswith('.gif') and ffmpeg:
+            if not _PIL_AVAILABLE:
+                result["error"] = "Pillow is needed to tell animated GIFs from still ones"
+                return result
+            from PIL import Image
+
+            with Image.open(path) as img:
+                if not getattr(img, "is_animated", False):
+                    # A one-frame video would lose transparency and gain nothing
+                    result["error"] = "still GIF left as is"
+                    return result
+            # Even dimensions and yuv420p so every player can decode the H.264 stream
+            target = _transcode_target(path, ".mp4")
+            _run_ffmpeg(ffmpeg, ["-i", path, "-movflags", "+faststart", "-pix_fmt", "yuv420p",
+                                 "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2", "-c:v", "libx264", "-crf", "23",
+                                 "-an", "-f", "mp4", target + ".part"])
+        elif lower.endswith('.png'):
+            from PIL import Image
+
+            target = _transcode_target(path, ".webp")
+            with Image.open(path) as img:
+                if getattr(img, "is_animated", False):
+                    result["error"] = "animated PNG left as is"
+                    return result
+                img.save(target + ".part", "WEBP", lossless=True, method=4)
+        elif lower.endswith('.mp4') and ffmpeg:
+            if _mp4_is_faststart(path):
+                return result
+            # Lossless re-mux, so the original is always replaced whatever the policy
+            target = path
+            _run_ffmpeg(ffmpeg, ["-i", path, "-map", "0", "-c", "copy", "-movflags", "+faststart",
+                                 "-f", "mp4", path + ".part"])
+        else:
+            return result
+
+        new_size = os.path.getsize(target + ".part")
+        if target != path and new_size >= size:
+            os.remove(target + ".part")
+            result["status"] = "kept"
+            result["error"] = "not smaller"
+            return result
+        os.replace(target + ".part", target)
+        result["after"] = new_size
+        if target == path:
+            result["status"] = "remuxed"
+        else:
+            result["status"] = "converted"
+            result["output"] = target
+            if replace:
+                os.remove(path)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e) or e.__class__.__name__
+    finally:
+        finished = os.times()
+        result["cpu"] = round(sum(finished[:4]) - sum(started[:4]), 3)
+        if fingerprint:
+            # Media check runs here, on whatever files are left, so it never races the transcode
+            for remaining in (path, result["output"]):
+                if remaining and os.path.exists(remaining) and _is_checkable_media(remaining):
+                    result["checks"].append(_fingerprint_media_file(remaining))
+    return result
+
+
+def _is_transcodable(path: str, ffmpeg: str | None) -> bool:
+    lower = path.lower()
+    return lower.endswith('.png') if not ffmpeg else lower.endswith(('.png', '.gif', '.mp4'))
+
+
+def start_transcode(output_dir: str, log_callback, workers: int | None = None, policy: str = "keep") -> dict | None:
+    """Start the process pool that recompresses files as they finish downloading."""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg and not _PIL_AVAILABLE:
+        log_callback("Transcoding skipped: it needs ffmpeg on the PATH or Pillow (pip install pillow).")
+        return None
+    if not ffmpeg:
+        log_callback("ffmpeg not found: only PNG files will be recompressed.")
+    return {
+        "output_dir": output_dir,
+        "index": load_transcode_index(output_dir),
+        "executor": ProcessPoolExecutor(max_workers=_media_check_workers(workers or _transcode_settings["workers"])),
+        "futures": [],
+        "ffmpeg": ffmpeg,
+        "replace": policy == "replace",
+    }
+
+
+def submit_transcode(stage: dict | None, path: str, media_check: dict | None = None) -> None:
+    """Queue path for transcoding; files that skip it go straight to the media check."""
+    if stage is None or not _is_transcodable(path, stage["ffmpeg"]):
+        submit_media_check(media_check, path)
+        return
+    record = stage["index"]["files"].get(os.path.relpath(path, stage["output_dir"]))
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return
+    if record and size in (record.get("before"), record.get("after")):
+        # Handled on an earlier run: a re-download of a converted original goes the same way again
+        output = record.get("output") and os.path.join(stage["output_dir"], record["output"])
+        if stage["replace"] and output and os.path.exists(output):
+            os.remove(path)
+        else:
+            submit_media_check(media_check, path)
+        return
+    stage["futures"].append(stage["executor"].submit(
+        _transcode_media_file, path, stage["replace"], stage["ffmpeg"], media_check is not None))
+
+
+def _record_transcode_results(stage: dict, results, log_callback, media_check=None) -> dict:
+    files = stage["index"]["files"]
+    # freed: disk space released (negative while new copies sit next to kept originals); kept: size of those originals
+    totals = {"converted": 0, "remuxed": 0, "failed": 0, "freed": 0, "kept": 0, "kept_files": 0, "cpu": 0.0}
+    for result in results:
+        checks = result.pop("checks")
+        if media_check is not None:
+            _record_media_results(media_check, checks, log_callback)
+        rel = os.path.relpath(result.pop("path"), stage["output_dir"])
+        output = result["output"] and os.path.relpath(result["output"], stage["output_dir"])
+        files[rel] = dict(result, output=output)
+        totals["cpu"] += result["cpu"]
+        if result["status"] == "failed":
+            totals["failed"] += 1
+            log_callback(f"  ✗ Transcode failed: {rel} ({result['error']})")
+            continue
+        if result["status"] in ("converted", "remuxed"):
+            totals[result["status"]] += 1
+            if result["status"] == "remuxed" or stage["replace"]:
+                totals["freed"] += result["before"] - result["after"]
+            else:
+                totals["freed"] -= result["after"]
+                totals["kept"] += result["before"]
+                totals["kept_files"] += 1
+        if output:
+            # Outputs are recorded too, so they are never picked up as new input
+            files[output] = {"status": "output", "source": rel, "before": result["after"], "after": result["after"]}
+    return totals
+
+
+def finish_transcode(stage: dict | None, log_callback, media_check: dict | None = None) -> None:
+    """Wait for pending transcodes, save the index and report what they saved. Call before finish_media_check."""
+    if stage is None:
+        return
+    try:
+        totals = _record_transcode_results(stage, (f.result() for f in as_completed(stage["futures"])),
+                                           log_callback, media_check)
+    finally:
+        stage["executor"].shutdown()
+    stage["futures"] = []
+    try:
+        save_transcode_index(stage["output_dir"], stage["index"])
+    except OSError as e:
+        log_callback(f"Failed to save transcode index: {e}")
+
+    text = (f"Transcode: {totals['converted']} converted, {totals['remuxed']} re-muxed, {totals['failed']} failed, "
+            f"{totals['cpu']:.1f}s CPU, "
+            + (f"{_format_bytes(totals['freed'])} saved." if totals["freed"] >= 0
+               else f"{_format_bytes(-totals['freed'])} added by new copies."))
+    if totals["kept_files"]:
+        text += (f" Deleting the {totals['kept_files']} kept original(s) would free"
+                 f" {_format_bytes(totals['kept'] + totals['freed'])} in total.")
+    log_callback(text)
+
+
+def transcode_archive(output_dir: str, log_callback, workers: int | None = None, policy: str = "keep",
+                      stop_event=None) -> None:
+    """Transcode every eligible file already under output_dir that no earlier run has handled."""
+    stage = start_transcode(output_dir, log_callback, workers, policy)
+    if stage is None:
+        return
+    for dirpath, _dirnames, filenames in os.walk(output_dir):
+        for name in filenames:
+            if stop_event and stop_event.is_set():
+                break
+            submit_transcode(stage, os.path.join(dirpath, name))
+    log_callback(f"Transcoding {len(stage['futures'])} file(s)...")
+    if stop_event and stop_event.is_set():
+        stage["executor"].shutdown(cancel_futures=True)
+        stage["futures"] = [f for f in stage["futures"] if not f.cancelled()]
+    finish_transcode(stage, log_callback)
+
+
+# Command line
+def _read_cookie_arg(args) -> str:
+    if args.cookie_file:
+        with open(args.cookie_file, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    return args.cookie or os.environ.get("REDDIT_COOKIE", "")
+
+
+def _cli_log(msg):
+    print(msg, flush=True)
+
+
+def apply_rate_command(line: str, log_callback) -> bool:
+    """Handle 'rate 5M', 'rate HOST 2M', 'rate job N 1M' or 'rate off'. Returns False if line isn't one."""
+    parts = line.split()
+    if not parts or parts[0].lower() != "rate" or len(parts) not in (2, 3, 4):
+        return False
+    if (parts[1].lower() == "job") != (len(parts) == 4):
+        return False
+    try:
+        if len(parts) == 4 and parts[1].lower() == "job":
+            rate = parse_rate(parts[3])
+            set_bandwidth_limit(rate, job=int(parts[2]))
+            log_callback(f"Job {parts[2]} speed limit: {format_rate(rate)}")
+        elif len(parts) == 3:
+            rate = parse_rate(parts[2])
+            set_bandwidth_limit(rate, host=parts[1])
+            log_callback(f"{parts[1]} speed limit: {format_rate(rate)}")
+        else:
+            rate = parse_rate(parts[1])
+            set_bandwidth_limit(rate)
+            log_callback(f"Speed limit: {format_rate(rate)}")
+    except ValueError as e:
+        log_callback(str(e))
+    return True
+
+
+def _start_rate_control(log_callback) -> None:
+    """Read speed-limit commands from stdin while a CLI run is in progress."""
+    if sys.stdin is None or not sys.stdin.isatty():
+        return
+
+    def read_commands():
+        for line in sys.stdin:
+            if line.strip() and not apply_rate_command(line, log_callback):
+                log_callback("Commands: rate 5M | rate HOST 2M | rate job N 1M | rate off")
+
+    Thread(target=read_commands, daemon=True).start()
+
+
+def run_cli(argv) -> int:
+    parser = argparse.ArgumentParser(
+        prog="Bulk_Downloader.py",
+        description="Download media from your Reddit saved posts. Run without arguments to open the GUI.")
+    parser.add_argument("--url", help="your saved posts URL, e.g. https://reddit.com/user/NAME/saved/")
+    parser.add_argument("--cookie", help="Cookie header string (prefer --cookie-file or $REDDIT_COOKIE: arguments are visible to other processes)")
+    parser.add_argument("--cookie-file", help="file containing the Cookie header string")
+    parser.add_argument("--output", default=os.getcwd(), help="output folder (default: current folder)")
+    parser.add_argument("--check-media", action="store_true", help="verify downloads and flag near-duplicates")
+    parser.add_argument("--check-archive", action="store_true", help="only run the media check over everything already in --output")
+    parser.add_argument("--transcode", choices=TRANSCODE_POLICIES,
+                        help="shrink downloads (GIF→MP4, PNG→lossless WebP, MP4 faststart); keep or replace the originals")
+    parser.add_argument("--transcode-archive", choices=TRANSCODE_POLICIES,
+                        help="only transcode everything already in --output, keeping or replacing the originals")
+    parser.add_argument("--transcode-workers", type=int, help="processes used for transcoding (default: one per CPU)")
+    parser.add_argument("--plan", action="store_true", help="dry run: resolve media and report sizes and free space without downloading")
+    parser.add_argument("--save-plan", metavar="FILE", help="with --plan, write the plan to FILE")
+    parser.add_argument("--from-plan", metavar="FILE", help="download from a plan saved by --plan --save-plan, skipping the listing")
+    parser.add_argument("--jobs", metavar="FILE", help="run every job in a JSON list of {url, cookie_file, output} at once")
+    parser.add_argument("--workers", type=int, default=4, help="number of download workers; with --jobs, shared by all jobs (default: 4)")
+    parser.add_argument("--order", choices=SCHEDULE_POLICIES, default="interleave",
+                        help="which posts to download first: interleave big and small (default), smallest, newest, or listing order")
+    parser.add_argument("--per-host", type=int, default=4, help="max concurrent downloads from one host (default: 4)")
+    parser.add_argument("--transport", choices=("http1", "http2"), default="http1",
+                        help="http2 multiplexes media downloads over fewer connections (needs httpx[http2])")
+    parser.add_argument("--max-rate", type=parse_rate, default=0, metavar="RATE",
+                        help="cap total download speed, e.g. 5M or 750K (type 'rate 2M' while running to change it)")
+    parser.add_argument("--host-rate", action="append", default=[], metavar="HOST=RATE",
+                        help="cap download speed from one media host, e.g. i.redd.it=2M (repeatable)")
+    parser.add_argument("--queue", metavar="DB_OR_URL",
+                        help="shared work queue: an SQLite file on this machine, or the http:// address of --serve-queue")
+    parser.add_argument("--enqueue", action="store_true", help="list and resolve saved posts once and add them to --queue")
+    parser.add_argument("--work", action="store_true", help="download posts claimed from --queue until it is empty")
+    parser.add_argument("--serve-queue", metavar="[HOST:]PORT", help="serve the --queue SQLite file to workers on other machines")
+    parser.add_argument("--queue-token", default=os.environ.get("RBD_QUEUE_TOKEN"),
+                        help="shared secret for --serve-queue and its clients (default: $RBD_QUEUE_TOKEN)")
+    parser.add_argument("--daemon", action="store_true", help="keep running and download new saves as they appear")
+    parser.add_argument("--interval", type=int, default=300, help="with --daemon, seconds between polls (default: 300)")
+    args = parser.parse_args(argv)
+
+    stop_event = Event()
+    try:
+        set_transcode_workers(args.transcode_workers)
+        if args.transcode_archive:
+            transcode_archive(args.output, _cli_log, policy=args.transcode_archive, stop_event=stop_event)
+            if not args.check_archive:
+                return 0
+        if args.check_archive:
+            check_media_archive(args.output, _cli_log, stop_event=stop_event)
+            return 0
+
+        set_max_connections_per_host(args.per_host)
+        set_http_transport(args.transport, _cli_log)
+        set_bandwidth_limit(args.max_rate)
+        for spec in args.host_rate:
+            host, sep, rate = spec.partition("=")
+            try:
+                if not (sep and host):
+                    raise ValueError(f"expected HOST=RATE, got {spec!r}")
+                set_bandwidth_limit(parse_rate(rate), host=host.strip())
+            except ValueError as e:
+                parser.error(f"--host-rate: {e}")
+        _start_rate_control(_cli_log)
+        if args.jobs:
+            try:
+                jobs = load_jobs_file(args.jobs, args.output)
+            except (OSError, ValueError) as e:
+                parser.error(f"could not read {args.jobs}: {e}")
+            statuses = run_download_jobs(jobs, _cli_log, stop_event=stop_event, workers=args.workers)
+            return 0 if all(status["state"] == "done" for status in statuses) else 1
+
+        if args.serve_queue or args.enqueue or args.work:
+            if not args.queue:
+                parser.error("--serve-queue, --enqueue and --work need --queue")
+            if args.serve_queue:
+                if args.queue.startswith(("http://", "https://")):
+                    parser.error("--serve-queue needs --queue to be an SQLite file")
+                serve_work_queue(args.queue, args.serve_queue, _cli_log, args.queue_token, stop_event)
+                return 0
+            queue = open_work_queue(args.queue, args.queue_token)
+            if args.enqueue:
+                cookie = _read_cookie_arg(args)
+                if not args.from_plan and not (args.url and cookie):
+                    parser.error("--enqueue needs --from-plan, or --url and a cookie")
+                if enqueue_saved_posts(args.url, cookie, queue, args.output, _cli_log, stop_event, args.from_plan) is None:
+                    return 1
+            if args.work:
+                run_queue_worker(queue, args.output, _cli_log, workers=args.workers, stop_event=stop_event,
+                                 check_media=args.check_media, transcode=args.transcode)
+            return 0
+
+        cookie = _read_cookie_arg(args)
+        if not args.from_plan and not (args.url and cookie):
+            parser.error("--url and a cookie (--cookie, --cookie-file or $REDDIT_COOKIE) are required")
+
+        if args.daemon:
+            run_sync_daemon(args.url, cookie, args.output, _cli_log, interval=max(args.interval, 30),
+                            stop_event=stop_event, check_media=args.check_media, transcode=args.transcode)
+            return 0
+
+        if args.plan:
+            plan = build_download_plan(args.url, cookie, args.output, _cli_log, stop_event)
+            if plan is None:
+                return 1
+            fits = summarize_download_plan(plan, args.output, _cli_log)
+            if args.save_plan:
+                save_download_plan(plan, args.save_plan)
+                _cli_log(f"Plan saved to {args.save_plan}. Run again with --from-plan {args.save_plan} to download it.")
+            return 0 if fits else 2
+
+        scrape_reddit_saved(args.url, cookie, args.output, _cli_log, stop_event=stop_event,
+                            check_media=args.check_media, plan_path=args.from_plan, transcode=args.transcode,
+                            workers=args.workers, policy=args.order)
+        return 0
+    except KeyboardInterrupt:
+        stop_event.set()
+        abort_active_transfers()
+        _cli_log("⏹ Stopped.")
+        return 130
+
+
+# GUI Setup
+# Progress tracking variables
+progress_state = {"total": 0, "current": 0, "active": False}
+# Download control variables
+pause_event = PauseEvent()
+stop_event = Event()
+download_thread = None
+
+pause_btn = None
+stop_btn = None
+
+def ensure_run_buttons():
+    """Build the Pause/Stop buttons and the Stop style on first use; the window doesn't need them to open."""
+    global pause_btn, stop_btn
+    if pause_btn is not None:
+        return
+    # Configure Stop button style (red/danger)
+    style.configure("Stop.TButton",
+                   background="#d32f2f",
+                   foreground="#ffffff",
+                   font=("Segoe UI", 10, "bold"),
+                   padding=(20, 8))
+    style.map("Stop.TButton",
+             background=[('active', '#b71c1c')],
+             relief=[('pressed', 'sunken')])
+
+    pause_btn = ttk.Button(button_frame, text="⏸ Pause Download", 
+                          command=pause_download,
+                          style="Accent.TButton")
+
+    stop_btn = ttk.Button(button_frame, text="⏹ Stop Download", 
+                         command=stop_download,
+                         style="Stop.TButton")
+
+def restore_start_button():
+    if pause_btn is not None:
+        pause_btn.pack_forget()
+        stop_btn.pack_forget()
+    download_btn.pack(ipadx=25, ipady=8)
+
+def start_download():
+    global download_thread
+    
+    url = url_entry.get().strip()
+    cookie = cookie_entry.get().strip()
+    folder = folder_entry.get().strip() or os.getcwd()
+
+    if not url or not cookie:
+        messagebox.showwarning("Input Needed", "Please provide both URL and Cookie.")
+        return
+
+    # Reset progress and control events
+    progress_state["total"] = 0
+    progress_state["current"] = 0
+    progress_state["active"] = True
+    pause_event.clear()
+    stop_event.clear()
+    progress_label.config(text="")
+    progress_label.pack_forget()  # Hide initially
+    output_box.delete(1.0, END)  # Clear previous log
+    
+    # Update UI to show pause/stop buttons
+    ensure_run_buttons()
+    download_btn.pack_forget()
+    pause_btn.pack(side='left', padx=(0, 8), ipadx=20, ipady=8)
+    stop_btn.pack(side='left', ipadx=20, ipady=8)
+
+    def log(msg):
+        # Update GUI on main thread
+        root.after(0, lambda: output_box.insert(END, msg + "\n"))
+        root.after(0, lambda: output_box.see(END))
+        
+        # Parse "Found X saved items" message to extract total
+        if "Found" in msg and "saved items" in msg:
+            match = re.search(r'Found (\d+) saved items', msg)
+            if match:
+                progress_state["total"] = int(match.group(1))
+                progress_state["current"] = 0
+                root.after(0, update_progress_label)
+        
+        # Track when download workers start posts
+        if "Downloading post:" in msg:
+            progress_state["current"] += 1
+            root.after(0, update_progress_label)
+        
+        # Hide progress when done
+        if "Done downloading" in msg or "✅" in msg or "Stopped" in msg:
+            progress_state["active"] = False
+            root.after(100, lambda: progress_label.pack_forget())
+            root.after(100, restore_start_button)
+
+    def update_progress_label():
+        if progress_state["active"] and progress_state["total"] > 0:
+            current = progress_state["current"]
+            total = progress_state["total"]
+            percentage = int((current / total) * 100) if total > 0 else 0
+            progress_text = f"{current}/{total} ({percentage}%)"
+            progress_label.config(text=progress_text)
+            if not progress_label.winfo_viewable():
+                progress_label.pack(side='right')
+
+    download_thread = Thread(target=scrape_reddit_saved, args=(url, cookie, folder, log, pause_event, stop_event, check_media_var.get()),
+                             kwargs={"policy": download_order_var.get(),
+                                     "transcode": "replace" if transcode_var.get() else None}, daemon=True)
+    download_thread.start()
+
+def pause_download():
+    if pause_event.is_set():
+        # Resume
+        pause_event.clear()
+        pause_btn.config(text="⏸ Pause Download")
+    else:
+        # Pause
+        pause_event.set()
+        pause_btn.config(text="▶ Resume Download")
+
+def stop_download():
+    stop_event.set()
+    pause_event.clear()  # Clear pause so we can exit
+    # Drop in-flight connections now instead of waiting for the current chunk
+    Thread(target=abort_active_transfers, daemon=True).start()
+    progress_state["active"] = False
+    root.after(100, restore_start_button)
+
+
+def apply_speed_limit(*_):
+    # Takes effect immediately, including for downloads already running
+    value = speed_limit_var.get().strip()
+    try:
+        rate = int(float(value) * 1024 * 1024) if value else 0
+    except ValueError:
+        return
+    set_bandwidth_limit(max(rate, 0))
+
+
+def browse_folder():
+    folder = filedialog.askdirectory()
+    if folder:
+        folder_entry.delete(0, END)
+        folder_entry.insert(0, folder)
+
+
+def create_tooltip(widget, text, delay_ms=500):
+    """Show a tooltip on hover, hide on leave. Does not take layout space."""
+    tooltip_window = None
+    after_id = None
+
+    def show_tooltip(event):
+        nonlocal tooltip_window, after_id
+        if after_id:
+            root.after_cancel(after_id)
+            after_id = None
+        if tooltip_window:
+            return
+        def do_show():
+            nonlocal tooltip_window
+            if tooltip_window:
+                return
+            tooltip_window = Toplevel(root)
+            tooltip_window.overrideredirect(True)
+            tooltip_window.withdraw()
+            lbl = Label(tooltip_window, text=text, font=("Segoe UI", 9),
+                        bg="#2d2d2d", fg="#e0e0e0", relief='solid', bd=1,
+                        padx=10, pady=8, wraplength=320, justify='left')
+            lbl.pack()
+            tooltip_window.update_idletasks()
+            x = widget.winfo_rootx() + 16
+            y = widget.winfo_rooty() + widget.winfo_height() + 4
+            tooltip_window.geometry(f"+{x}+{y}")
+            tooltip_window.deiconify()
+        after_id = root.after(delay_ms, do_show)
+
+    def hide_tooltip(event):
+        nonlocal tooltip_window, after_id
+        if after_id:
+            root.after_cancel(after_id)
+            after_id = None
+        if tooltip_window:
+            tooltip_window.destroy()
+            tooltip_window = None
+
+    widget.bind('<Enter>', show_tooltip)
+    widget.bind('<Leave>', hide_tooltip)
+
+
+def _help_icon_cache_path(bg_color, size) -> str:
+    cache_root = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_root, "RedditBulkDownloader", f"help_icon_{bg_color.lstrip('#')}_{size}.png")
+
+
+def _render_help_icon_png(path, bg_color, size) -> bool:
+    """Render the '?' in circle icon with PIL (high-res render + downscale for anti-aliasing) and save it as a PNG."""
+    if not _PIL_AVAILABLE:
+        return False
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+        scale = 3
+        w, h = size * scale, size * scale
+        bg = bg_color.lstrip("#")
+        bg_rgb = tuple(int(bg[i:i+2], 16) for i in (0, 2, 4))
+        img = Image.new("RGB", (w, h), bg_rgb)
+        draw = ImageDraw.Draw(img)
+        # White circle ring: outer white, inner bg by drawing filled white circle then smaller filled bg circle
+        margin = scale * 2
+        draw.ellipse([margin, margin, w - margin, h - margin], fill=(255, 255, 255), outline=None)
+        inner = scale * 3
+        draw.ellipse([inner, inner, w - inner, h - inner], fill=bg_rgb, outline=None)
+        # White "?" in center
+        try:
+            font = ImageFont.truetype("segoeui.ttf", 14 * scale)
+        except OSError:
+            try:
+                font = ImageFont.truetype("arial.ttf", 14 * scale)
+            except OSError:
+                font = ImageFont.load_default()
+        text = "?"
+        bbox = draw.textbbox((0, 0), text, font=font)
+        tw = bbox[2] - bbox[0]
+        th = bbox[3] - bbox[1]
+        x = (w - tw) // 2 - bbox[0]
+        y = (h - th) // 2 - bbox[1]
+        draw.text((x, y), text, fill=(255, 255, 255), font=font)
+        resample = getattr(Image, "Resampling", None) and Image.Resampling.LANCZOS or getattr(Image, "LANCZOS", Image.BICUBIC)
+        img_small = img.resize((size, size), resample)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        img_small.save(tmp_path, "PNG")
+        os.replace(tmp_path, path)
+        return True
+    except Exception:
+        return False
+
+
+def create_smooth_help_icon(parent, bg_color, size=22, render=True):
+    """Create a smooth, anti-aliased '?' in circle icon. The PIL render is cached on disk as a PNG, so later starts load it with plain Tk and never import PIL; with render=False only the cache is tried. Returns (photo_image, label_widget) or (None, None) if unavailable."""
+    path = _help_icon_cache_path(bg_color, size)
+    if not os.path.exists(path) and not (render and _render_help_icon_png(path, bg_color, size)):
+        return None, None
+    try:
+        photo = PhotoImage(file=path)
+    except TclError:
+        return None, None
+    label = Label(parent, image=photo, bg=bg_color, cursor="question_arrow")
+    label._photo = photo
+    return photo, label
+
+
+def upgrade_cookie_help_icon():
+    """Swap the canvas fallback for the smooth icon once the window is up; the render is cached for next start."""
+    global cookie_help_icon, cookie_help_icon_photo
+    photo, label = create_smooth_help_icon(cookie_label_row, section_bg, _help_icon_size)
+    if label is None:
+        return
+    label.pack(side='left', padx=(4, 0), after=cookie_help_icon)
+    cookie_help_icon.destroy()
+    cookie_help_icon, cookie_help_icon_photo = label, photo
+    create_tooltip(cookie_help_icon, COOKIE_HELP_TEXT)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
+
+    from tkinter import *
+    from tkinter import ttk, messagebox, filedialog
+
+    root = Tk()
+    root.title("Reddit Saved Media Downloader")
+    root.geometry("750x600")
+
+    if os.environ.get("RBD_STARTUP_BENCHMARK"):
+        # Used by benchmarks/bench_startup.py: report time to first window, then quit
+        def report_first_window():
+            heavy = [name for name in ("requests", "bs4", "PIL") if name in sys.modules]
+            print(f"first_window_ms={(time.perf_counter() - _STARTUP_T0) * 1000:.1f} heavy_modules={','.join(heavy) or 'none'}", flush=True)
+            root.destroy()
+        root.after_idle(lambda: root.after(0, report_first_window))
+
+    # Configure dark mode color scheme
+    bg_color = "#1e1e1e"  # Dark background
+    section_bg = "#2d2d2d"  # Darker section background
+    accent_color = "#ff4500"  # Reddit orange
+    text_color = "#e0e0e0"  # Light text
+    text_color_secondary = "#b0b0b0"  # Secondary text
+    border_color = "#404040"  # Dark border
+    entry_bg = "#1a1a1a"  # Even darker for entries
+    entry_fg = "#ffffff"  # White text in entries
+
+    root.configure(bg=bg_color)
+
+    # Configure ttk style for dark mode
+    style = ttk.Style()
+    style.theme_use('clam')
+
+    # Configure Entry style for dark mode
+    style.configure("TEntry",
+                   fieldbackground=entry_bg,
+                   foreground="#888888",  # Greyed out text for placeholder
+                   borderwidth=1,
+                   relief='flat')
+
+    # Configure Button style for dark mode
+    style.configure("TButton",
+                   background=section_bg,
+                   foreground=text_color,
+                   borderwidth=1,
+                   relief='flat',
+                   padding=5)
+    style.map("TButton",
+             background=[('active', '#3d3d3d')],
+             relief=[('pressed', 'sunken')])
+
+    # Configure Accent button style
+    style.configure("Accent.TButton",
+                   background=accent_color,
+                   foreground="#ffffff",
+                   font=("Segoe UI", 10, "bold"),
+                   padding=(20, 8))
+    style.map("Accent.TButton",
+             background=[('active', '#ff5500')],
+             relief=[('pressed', 'sunken')])
+
+    # Configure Scrollbar style
+    style.configure("TScrollbar",
+                   background=section_bg,
+                   troughcolor=bg_color,
+                   borderwidth=0,
+                   arrowcolor=text_color,
+                   darkcolor=section_bg,
+                   lightcolor=section_bg)
+
+    # Compact header section
+    header_frame = Frame(root, bg=section_bg, relief='flat', bd=0)
+    header_frame.pack(fill='x', padx=12, pady=(10, 8))
+
+    title_label = Label(header_frame, text="Reddit Bulk Downloader", 
+                        font=("Segoe UI", 16, "bold"), 
+                        bg=section_bg, fg=text_color)
+    title_label.pack(pady=(10, 3))
+
+    subtitle_label = Label(header_frame, text="Download your saved Reddit posts and media", 
+                          font=("Segoe UI", 8), 
+                          bg=section_bg, fg=text_color_secondary)
+    subtitle_label.pack(pady=(0, 10))
+
+    # Main content frame
+    main_frame = Frame(root, bg=bg_color)
+    main_frame.pack(fill='both', expand=True, padx=12, pady=(0, 12))
+
+    # Compact input section
+    input_section = Frame(main_frame, bg=section_bg, relief='flat', bd=1)
+    input_section.pack(fill='x', pady=(0, 10))
+
+    # Section title
+    section_title = Label(input_section, text="Configuration", 
+                         font=("Segoe UI", 10, "bold"), 
+                         bg=section_bg, fg=text_color, anchor='w')
+    section_title.pack(fill='x', padx=15, pady=(12, 10))
+
+    # URL field
+    url_container = Frame(input_section, bg=section_bg)
+    url_container.pack(fill='x', padx=15, pady=(0, 10))
+
+    url_label = Label(url_container, text="Reddit Saved URL", 
+                     font=("Segoe UI", 8), 
+                     bg=section_bg, fg=text_color_secondary, anchor='w')
+    url_label.pack(fill='x', pady=(0, 4))
+
+    # Use regular Entry for URL field to allow individual color control
+    url_entry = Entry(url_container, width=100, font=("Segoe UI", 9),
+                     bg=entry_bg, fg="#666666",  # Greyed out placeholder color
+                     insertbackground=text_color,
+                     selectbackground="#404040",
+                     selectforeground=text_color,
+                     relief='flat', bd=1,
+                     highlightthickness=1,
+                     highlightcolor=accent_color,
+                     highlightbackground=border_color)
+    placeholder_text = " https://reddit.com/user/YOUR_USERNAME/saved/ "
+    url_entry.insert(0, placeholder_text)
+    url_entry.pack(fill='x', ipady=5)
+
+    # Make placeholder text greyed out, turn white when user types
+    def on_url_focus_in(event):
+        if url_entry.get() == placeholder_text:
+            url_entry.delete(0, END)
+            url_entry.config(fg=entry_fg)
+        else:
+            url_entry.config(fg=entry_fg)
+
+    def on_url_focus_out(event):
+        if url_entry.get().strip() == "":
+            url_entry.insert(0, placeholder_text)
+            url_entry.config(fg="#666666")
+
+    def on_url_key(event):
+        if url_entry.get() != placeholder_text:
+            url_entry.config(fg=entry_fg)
+
+    url_entry.bind('<FocusIn>', on_url_focus_in)
+    url_entry.bind('<FocusOut>', on_url_focus_out)
+    url_entry.bind('<Key>', on_url_key)
+
+    # Cookie field
+    cookie_container = Frame(input_section, bg=section_bg)
+    cookie_container.pack(fill='x', padx=15, pady=(0, 10))
+
+    cookie_label_row = Frame(cookie_container, bg=section_bg)
+    cookie_label_row.pack(fill='x', pady=(0, 4))
+    cookie_label = Label(cookie_label_row, text="Login Cookie", 
+                        font=("Segoe UI", 8), 
+                        bg=section_bg, fg=text_color_secondary, anchor='w')
+    cookie_label.pack(side='left')
+    # Help icon: smooth white circle + "?" (PIL high-res + downscale for anti-aliasing; fallback Canvas if no PIL).
+    # Only a cached render is used here; a fresh render would import PIL before the window shows.
+    _help_icon_size = 22
+    cookie_help_icon_photo, cookie_help_icon_label = create_smooth_help_icon(cookie_label_row, section_bg, _help_icon_size, render=False)
+    if cookie_help_icon_label is not None:
+        cookie_help_icon = cookie_help_icon_label
+        cookie_help_icon.pack(side='left', padx=(4, 0))
+    else:
+        cookie_help_icon = Canvas(cookie_label_row, width=_help_icon_size, height=_help_icon_size,
+                                  bg=section_bg, highlightthickness=0, cursor="question_arrow")
+        cookie_help_icon.pack(side='left', padx=(4, 0))
+        cookie_help_icon.create_oval(2, 2, _help_icon_size - 2, _help_icon_size - 2,
+                                     outline="#ffffff", width=1.5, fill=section_bg)
+        cookie_help_icon.create_text(_help_icon_size // 2, _help_icon_size // 2, text="?",
+                                     fill="#ffffff", font=("Segoe UI", 11, "bold"))
+        if _PIL_AVAILABLE:
+            # After the first paint: idle callbacks run once the initial layout and drawing are done
+            root.after_idle(lambda: root.after(0, upgrade_cookie_help_icon))
+    COOKIE_HELP_TEXT = "This is your Reddit session cookie. You can get it from your browser's developer tools (Network or Application tab) or by exporting request headers with a browser extension. Paste the full Cookie header string here."
+    create_tooltip(cookie_help_icon, COOKIE_HELP_TEXT)
+
+    cookie_entry = Entry(cookie_container, width=100, font=("Segoe UI", 9),
+                        bg=entry_bg, fg=entry_fg,
+                        insertbackground=text_color,
+                        selectbackground="#404040",
+                        selectforeground=text_color,
+                        relief='flat', bd=1,
+                        highlightthickness=0)  # No border
+    cookie_entry.pack(fill='x', ipady=5)
+
+    # Folder field
+    folder_container = Frame(input_section, bg=section_bg)
+    folder_container.pack(fill='x', padx=15, pady=(0, 8))
+
+    folder_label = Label(folder_container, text="Output Folder", 
+                        font=("Segoe UI", 8), 
+                        bg=section_bg, fg=text_color_secondary, anchor='w')
+    folder_label.pack(fill='x', pady=(0, 4))
+
+    folder_frame = Frame(folder_container, bg=section_bg)
+    folder_frame.pack(fill='x')
+    folder_entry = Entry(folder_frame, width=85, font=("Segoe UI", 9),
+                         bg=entry_bg, fg=entry_fg,
+                         insertbackground=text_color,
+                         selectbackground="#404040",
+                         selectforeground=text_color,
+                         relief='flat', bd=1,
+                         highlightthickness=0)  # No border
+    folder_entry.pack(side='left', fill='x', expand=True, ipady=5)
+    browse_btn = Button(folder_frame, text="Browse", command=browse_folder,
+                       bg=section_bg, fg=text_color,
+                       activebackground="#3d3d3d",
+                       activeforeground=text_color,
+                       font=("Segoe UI", 9),
+                       relief='solid', bd=1,
+                       highlightthickness=0,
+                       padx=12, pady=5)
+    browse_btn.pack(side='left', padx=(6, 0))
+
+    # Post-download media check (runs on a process pool, needs Pillow)
+    check_media_var = BooleanVar(value=False)
+    check_media_btn = Checkbutton(input_section, text="Verify media and flag near-duplicates after download",
+                                  variable=check_media_var,
+                                  font=("Segoe UI", 8),
+                                  bg=section_bg, fg=text_color_secondary,
+                                  activebackground=section_bg, activeforeground=text_color,
+                                  selectcolor=entry_bg, highlightthickness=0, bd=0, anchor='w')
+    check_media_btn.pack(fill='x', padx=15, pady=(0, 6))
+
+    # Post-download recompression (process pool; GIF/MP4 need ffmpeg, PNG needs Pillow)
+    transcode_var = BooleanVar(value=False)
+    transcode_btn = Checkbutton(input_section, text="Shrink media after download (GIF→MP4, PNG→WebP) and delete the originals",
+                                variable=transcode_var,
+                                font=("Segoe UI", 8),
+                                bg=section_bg, fg=text_color_secondary,
+                                activebackground=section_bg, activeforeground=text_color,
+                                selectcolor=entry_bg, highlightthickness=0, bd=0, anchor='w')
+    transcode_btn.pack(fill='x', padx=15, pady=(0, 6))
+
+    # Global speed limit, adjustable while a download is running
+    speed_row = Frame(input_section, bg=section_bg)
+    speed_row.pack(fill='x', padx=15, pady=(0, 12))
+    speed_label = Label(speed_row, text="Max speed (MB/s, blank = unlimited)",
+                        font=("Segoe UI", 8),
+                        bg=section_bg, fg=text_color_secondary, anchor='w')
+    speed_label.pack(side='left')
+    speed_limit_var = StringVar(value="")
+    speed_limit_var.trace_add("write", apply_speed_limit)
+    speed_entry = Entry(speed_row, width=8, font=("Segoe UI", 9),
+                        textvariable=speed_limit_var,
+                        bg=entry_bg, fg=entry_fg,
+                        insertbackground=text_color,
+                        selectbackground="#404040",
+                        selectforeground=text_color,
+                        relief='flat', bd=1,
+                        highlightthickness=0)
+    speed_entry.pack(side='left', padx=(8, 0), ipady=3)
+
+    # Which posts go first; interleave keeps big videos from holding up everything behind them
+    download_order_var = StringVar(value="interleave")
+    order_combo = ttk.Combobox(speed_row, textvariable=download_order_var, values=SCHEDULE_POLICIES,
+                               state="readonly", width=11, font=("Segoe UI", 9))
+    order_combo.pack(side='right', ipady=1)
+    order_label = Label(speed_row, text="Download order",
+                        font=("Segoe UI", 8),
+                        bg=section_bg, fg=text_color_secondary, anchor='w')
+    order_label.pack(side='right', padx=(0, 8))
+
+    # Download button section
+    button_frame = Frame(main_frame, bg=bg_color)
+    button_frame.pack(fill='x', pady=(0, 10))
+
+    download_btn = ttk.Button(button_frame, text="▶ Start Download", 
+                             command=start_download, 
+                             style="Accent.TButton")
+    download_btn.pack(ipadx=25, ipady=8)
+
+    # Pause and Stop buttons are built by ensure_run_buttons() when the first download starts
+
+    # Output log section - takes remaining space
+    log_section = Frame(main_frame, bg=section_bg, relief='flat', bd=1)
+    log_section.pack(fill='both', expand=True)
+
+    # Title bar with progress indicator on the right
+    title_frame = Frame(log_section, bg=section_bg)
+    title_frame.pack(fill='x', padx=15, pady=(12, 8))
+
+    log_title = Label(title_frame, text="Download Progress", 
+                     font=("Segoe UI", 10, "bold"), 
+                     bg=section_bg, fg=text_color, anchor='w')
+    log_title.pack(side='left')
+
+    # Progress indicator (initially hidden, appears on the right)
+    progress_label = Label(title_frame, text="", 
+                          font=("Segoe UI", 10, "bold"), 
+                          bg=section_bg, fg=accent_color, anchor='e')
+
+    # Output box with scrollbar
+    log_container = Frame(log_section, bg=section_bg)
+    log_container.pack(fill='both', expand=True, padx=15, pady=(0, 12))
+
+    scrollbar = ttk.Scrollbar(log_container)
+    scrollbar.pack(side='right', fill='y')
+
+    output_box = Text(log_container, wrap=WORD, 
+                     font=("Consolas", 8), 
+                     bg=entry_bg, fg="#d0d0d0",
+                     relief='flat', bd=0,
+                     yscrollcommand=scrollbar.set,
+                     padx=8, pady=8,
+                     insertbackground=text_color,
+                     selectbackground="#404040",
+                     selectforeground=text_color)
+    output_box.pack(side='left', fill='both', expand=True)
+
+    scrollbar.config(command=output_box.yview)
+
+    root.mainloop()
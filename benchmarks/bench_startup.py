@@ -0,0 +1,81 @@
+"""Startup benchmark for the GUI: import cost and time to first window.
+
+    python benchmarks/bench_startup.py [--runs 10] [--cold-icon]
+
+Needs a display (the window is really created, then closed as soon as it has painted).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "Bulk_Downloader.py")
+
+
+def measure_import():
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import Bulk_Downloader"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    # Children are listed before their parent, indented one level deeper
+    children = []
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        cumulative, name = int(parts[1]), parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0:
+            if name.strip() == "Bulk_Downloader":
+                return cumulative, sorted(children, reverse=True)[:5]
+            children = []
+        elif depth == 1:
+            children.append((cumulative, name.strip()))
+    raise RuntimeError("Bulk_Downloader not found in -X importtime output")
+
+
+def measure_first_window(cold_icon):
+    env = dict(os.environ, RBD_STARTUP_BENCHMARK="1")
+    if cold_icon:
+        sys.path.insert(0, ROOT)
+        from Bulk_Downloader import _help_icon_cache_path
+        try:
+            os.remove(_help_icon_cache_path("#2d2d2d", 22))
+        except OSError:
+            pass
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, SCRIPT], env=env, capture_output=True, text=True, timeout=60)
+    wall_ms = (time.perf_counter() - start) * 1000
+    fields = dict(item.split("=", 1) for item in proc.stdout.split() if "=" in item)
+    if "first_window_ms" not in fields:
+        sys.exit(f"no benchmark output (is a display available?)\n{proc.stderr.strip().splitlines()[-1]}")
+    return float(fields["first_window_ms"]), wall_ms, fields.get("heavy_modules", "?")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--cold-icon", action="store_true", help="delete the cached help icon before every run")
+    args = parser.parse_args()
+
+    import_us, heaviest = measure_import()
+    print(f"module import (cumulative): {import_us / 1000:.1f} ms")
+    for us, name in heaviest:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    first_window, wall = [], []
+    heavy = "?"
+    for _ in range(args.runs):
+        fw, w, heavy = measure_first_window(args.cold_icon)
+        first_window.append(fw)
+        wall.append(w)
+    print(f"time to first window (after imports): median {statistics.median(first_window):.1f} ms, "
+          f"min {min(first_window):.1f} ms over {args.runs} runs")
+    print(f"process start to exit: median {statistics.median(wall):.1f} ms")
+    print(f"heavy modules loaded at first window: {heavy}")
+
+
+if __name__ == "__main__":
+    main()
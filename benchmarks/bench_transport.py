@@ -0,0 +1,167 @@
+"""HTTP/1.1 (requests) vs HTTP/2 (httpx) media transport, against local stand-in servers.
+
+    python benchmarks/bench_transport.py [--files 300] [--size 40000] [--workers 16] [--latency-ms 20]
+
+Both servers serve the same set of small "images", add the same per-request latency and
+charge a handshake delay per new connection (standing in for TCP+TLS setup to a CDN).
+The HTTP/2 server speaks h2c with prior knowledge, so no certificates are needed.
+Needs the h2 and httpx packages (pip install httpx[http2]).
+"""
+import argparse
+import asyncio
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import h2.config
+import h2.connection
+import h2.events
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Bulk_Downloader as bd  # noqa: E402
+
+
+class H2Server(asyncio.Protocol):
+    def __init__(self, files, latency, handshake, stats):
+        self.files, self.latency, self.handshake, self.stats = files, latency, handshake, stats
+        self.conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        self.pending = {}  # stream_id -> bytes still to send
+        self.ready = None
+
+    def connection_made(self, transport):
+        self.stats["connections"] += 1
+        self.transport = transport
+        self.ready = asyncio.ensure_future(asyncio.sleep(self.handshake))
+        self.conn.initiate_connection()
+        transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        for event in self.conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                path = dict(event.headers)[b":path"].decode()
+                asyncio.ensure_future(self.respond(event.stream_id, path))
+            elif isinstance(event, h2.events.WindowUpdated):
+                for stream_id in list(self.pending):
+                    self.flush(stream_id)
+            elif isinstance(event, h2.events.StreamReset):
+                self.pending.pop(event.stream_id, None)
+        self.transport.write(self.conn.data_to_send())
+
+    async def respond(self, stream_id, path):
+        await self.ready
+        await asyncio.sleep(self.latency)
+        body = self.files.get(path)
+        if body is None:
+            self.conn.send_headers(stream_id, [(":status", "404"), ("content-length", "0")], end_stream=True)
+        else:
+            self.conn.send_headers(stream_id, [(":status", "200"), ("content-length", str(len(body))),
+                                               ("content-type", "image/jpeg")])
+            self.pending[stream_id] = memoryview(body)
+            self.flush(stream_id)
+        self.transport.write(self.conn.data_to_send())
+
+    def flush(self, stream_id):
+        data = self.pending[stream_id]
+        while data:
+            window = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size)
+            if window <= 0:
+                self.pending[stream_id] = data
+                return
+            self.conn.send_data(stream_id, data[:window].tobytes())
+            data = data[window:]
+        self.conn.end_stream(stream_id)
+        del self.pending[stream_id]
+        self.transport.write(self.conn.data_to_send())
+
+
+def start_h2_server(files, latency, handshake, stats):
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(loop.create_server(
+        lambda: H2Server(files, latency, handshake, stats), "127.0.0.1", 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return server.sockets[0].getsockname()[1]
+
+
+def start_h1_server(files, latency, handshake, stats):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            stats["connections"] += 1
+            time.sleep(handshake)
+            super().setup()
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = files.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Content-Type", "image/jpeg")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_port
+
+
+def run(label, base_url, paths, workers, session, stats):
+    dest = tempfile.mkdtemp(prefix="bench_transport_")
+    stats["connections"] = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(
+            lambda p: bd._download_single_url(base_url + p, os.path.join(dest, p.strip("/")), dest, (15, 60), 2,
+                                              session=session),
+            paths))
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(dest, ignore_errors=True)
+    ok = sum(1 for r in results if r)
+    print(f"{label:<28} {elapsed:7.2f} s  {ok / elapsed:8.1f} files/s  {stats['connections']:4d} connections  "
+          f"{ok}/{len(paths)} ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--size", type=int, default=40_000, help="bytes per file")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent downloads")
+    parser.add_argument("--latency-ms", type=float, default=20, help="server delay per request")
+    parser.add_argument("--handshake-ms", type=float, default=60, help="server delay per new connection")
+    args = parser.parse_args()
+
+    files = {f"/img_{i:05d}.jpg": os.urandom(args.size) for i in range(args.files)}
+    paths = list(files)
+    latency, handshake = args.latency_ms / 1000, args.handshake_ms / 1000
+    h1_stats, h2_stats = {"connections": 0}, {"connections": 0}
+    h1_port = start_h1_server(files, latency, handshake, h1_stats)
+    h2_port = start_h2_server(files, latency, handshake, h2_stats)
+    bd.set_max_connections_per_host(args.workers)
+
+    print(f"{args.files} files x {args.size} bytes, {args.workers} workers, "
+          f"{args.latency_ms:g} ms per request, {args.handshake_ms:g} ms per connection")
+    bd.set_http_transport("http1")
+    run("http1, requests.get per file", f"http://127.0.0.1:{h1_port}", paths, args.workers, None, h1_stats)
+    session = bd._new_media_session(args.workers)
+    run("http1, shared session", f"http://127.0.0.1:{h1_port}", paths, args.workers, session, h1_stats)
+    if bd.set_http_transport("http2", print, max_connections=4, prior_knowledge=True) == "http2":
+        run("http2 (h2c), shared client", f"http://127.0.0.1:{h2_port}", paths, args.workers, None, h2_stats)
+    bd.set_http_transport("http1")
+
+
+if __name__ == "__main__":
+    main()